@@ -0,0 +1,80 @@
+"""
+Compare per-record `update_table` calls with `BatchWriter` against a moto-backed DynamoDB.
+
+Usage:
+    pip install -r benchmarks/requirements.txt
+    python benchmarks/bench_batch_writer.py --sales 2000
+"""
+import argparse, os, sys, time
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "layer"))
+
+from moto import mock_aws
+
+
+def create_table(dynamodb, table_name):
+    dynamodb.create_table(
+        TableName=table_name,
+        AttributeDefinitions=[
+            {"AttributeName": "sale_id", "AttributeType": "S"},
+            {"AttributeName": "employee_id", "AttributeType": "S"},
+        ],
+        KeySchema=[
+            {"AttributeName": "sale_id", "KeyType": "HASH"},
+            {"AttributeName": "employee_id", "KeyType": "RANGE"},
+        ],
+        BillingMode="PAY_PER_REQUEST",
+    )
+
+
+def make_sales(count):
+    return [
+        {
+            "id": i,
+            "employee_id": str(i % 50),
+            "branch_id": "Scranton",
+            "product": "paper",
+            "quantity": i % 7 + 1,
+            "date": "2023-06-01",
+            "transaction_timestamp": "2023-06-01 12:00:00",
+        }
+        for i in range(count)
+    ]
+
+
+def per_record(utils, table_name, sales):
+    for sale in sales:
+        key = utils.item_key(sale, "sale_")
+        record = utils.to_attributes(sale, "sale_", ("id",) + tuple(key))
+        utils.update_table(table_name, key, record)
+
+
+def batched(utils, table_name, sales):
+    with utils.BatchWriter(table_name, "sale_") as writer:
+        for sale in sales:
+            writer.put(sale)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sales", type=int, default=2000)
+    args = parser.parse_args()
+
+    with mock_aws():
+        from cascading_etl import utils
+
+        sales = make_sales(args.sales)
+        for name, write in (("update_table", per_record), ("BatchWriter", batched)):
+            table_name = f"sale-bench-{name}"
+            create_table(utils.get_client("dynamodb"), table_name)
+            start = time.perf_counter()
+            write(utils, table_name, sales)
+            elapsed = time.perf_counter() - start
+            print(f"{name:>12}: {len(sales) / elapsed:10.1f} items/sec")
+
+
+if __name__ == "__main__":
+    main()
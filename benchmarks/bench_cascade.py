@@ -0,0 +1,252 @@
+"""
+Run the three collectors end to end, in process, against moto and a stub of the Dunder Mifflin API.
+
+BranchCollector -> EmployeeQueue -> SalespersonCollector -> SaleQueue -> SaleCollector, the queues being consumed
+like an SQS event source mapping: batches of 10 messages, failed ones left in the queue. With --shards, the sale queue
+has that many shards, each consumed by its own event source mapping.
+The data set is generated by `workload.Workload`; with --runs, every run after the first sees --changed of it modified.
+
+Usage:
+    python benchmarks/bench_cascade.py --branches 3 --salespersons 10 --sales 20 --api-latency 0.02
+    python benchmarks/bench_cascade.py --branches 50 --skew 1 --runs 2 --changed 0.05
+    python benchmarks/bench_cascade.py --branches 10 --skew 1 --shards 4
+    python benchmarks/bench_cascade.py --min-rate 100  # exit with 1 below 100 sales/sec
+"""
+import argparse, importlib, json, math, os, sys, time
+from collections import Counter
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+root = os.path.join(os.path.dirname(__file__), "..")
+sys.path.insert(0, os.path.join(root, "layer"))
+
+from moto import mock_aws
+from workload import Workload
+
+
+def load_service(directory):
+    # every function has its own `service` package, imported from its directory one at a time
+    sys.path.insert(0, os.path.join(root, directory))
+    try:
+        return importlib.import_module("service.service")
+    finally:
+        sys.path.pop(0)
+        for name in [name for name in sys.modules if name.split(".")[0] == "service"]:
+            del sys.modules[name]
+
+
+def create_tables(dynamodb):
+    for name, hash_key, range_key in (
+        ("branch", "branch_id", None),
+        ("salesperson", "employee_id", "branch_id"),
+        ("sale", "sale_id", "employee_id"),
+        ("checkpoint", "employee_id", None),
+    ):
+        keys = [(hash_key, "HASH")] + ([(range_key, "RANGE")] if range_key else [])
+        dynamodb.create_table(
+            TableName=name,
+            AttributeDefinitions=[{"AttributeName": k, "AttributeType": "S"} for k, _ in keys],
+            KeySchema=[{"AttributeName": k, "KeyType": t} for k, t in keys],
+            BillingMode="PAY_PER_REQUEST",
+        )
+
+
+def meter_capacity(utils):
+    # read/write capacity units as DynamoDB would consume them: 1 RCU per 4 KB read, 1 WCU per 1 KB written,
+    # and the number of items written per table
+    capacity = Counter()
+    dynamodb = utils.get_client("dynamodb")
+    batch_get_item, batch_write_item = dynamodb.batch_get_item, dynamodb.batch_write_item
+    update_item, get_item = dynamodb.update_item, dynamodb.get_item
+
+    def size(item):
+        return len(json.dumps(item, default=str))
+
+    def metered_get(**kwargs):
+        response = batch_get_item(**kwargs)
+        for request in kwargs["RequestItems"].values():
+            capacity["RCU"] += len(request["Keys"])
+        for items in response["Responses"].values():
+            capacity["RCU"] += sum(math.ceil(size(item) / 4096) - 1 for item in items)
+        return response
+
+    def metered_write(**kwargs):
+        for table_name, requests in kwargs["RequestItems"].items():
+            capacity["WCU"] += sum(math.ceil(size(r["PutRequest"]["Item"]) / 1024) for r in requests)
+            capacity[table_name] += len(requests)
+        return batch_write_item(**kwargs)
+
+    def metered_update(**kwargs):
+        # a conditional write consumes its capacity even when the condition fails
+        capacity["WCU"] += math.ceil(size(kwargs["ExpressionAttributeValues"]) / 1024)
+        response = update_item(**kwargs)
+        capacity[kwargs["TableName"]] += 1
+        return response
+
+    dynamodb.batch_get_item, dynamodb.batch_write_item = metered_get, metered_write
+    def metered_get_item(**kwargs):
+        capacity["RCU"] += 1
+        return get_item(**kwargs)
+
+    dynamodb.update_item, dynamodb.get_item = metered_update, metered_get_item
+    return capacity
+
+
+def consume(utils, envelope, url, service, environment, origins=None, latencies=None, received=None):
+    # one batch of the event source mapping, False once the queue is empty
+    messages = utils.get_client("sqs").receive_message(QueueUrl=url, MaxNumberOfMessages=10)
+    messages = messages.get("Messages", [])
+    if not messages:
+        return False
+    if received is not None:
+        received[url] += len(messages)
+
+    event = {
+        "Records": [
+            {"messageId": m["MessageId"], "receiptHandle": m["ReceiptHandle"], "body": m["Body"]}
+            for m in messages
+        ]
+    }
+    failed = {f["itemIdentifier"] for f in service.main(event, environment)["batchItemFailures"]}
+    done = time.time()
+    succeeded = [m for m in messages if m["MessageId"] not in failed]
+    utils.delete_messages(url, succeeded)
+
+    for message in succeeded:
+        incoming = envelope.decode(message["Body"])
+        if origins is not None:
+            origins.setdefault(incoming["trace_id"], incoming["enqueued_at"])
+        if latencies is not None:
+            latencies.append(done - origins[incoming["trace_id"]])
+    return True
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))] if values else float("nan")
+
+
+def run_cascade(workload, services, queues, environments):
+    # one run of the three collectors, returning the latencies of the sale messages and the messages per sale shard
+    branches, salespersons, sales = services
+    from cascading_etl import envelope, utils
+
+    origins, latencies, received = {}, [], Counter()
+    branches.main({"branches": workload.branch_names()}, environments[0])
+    # the queues are consumed in turns, like event source mappings running side by side
+    busy = True
+    while busy:
+        busy = consume(utils, envelope, queues[0], salespersons, environments[1], origins)
+        for shard in queues[1:]:
+            busy |= consume(utils, envelope, shard, sales, environments[2], origins, latencies, received)
+    return latencies, [received[shard] for shard in queues[1:]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--branches", type=int, default=3)
+    parser.add_argument("--salespersons", type=int, default=10)
+    parser.add_argument("--sales", type=int, default=20)
+    parser.add_argument("--skew", type=float, default=0.0)
+    parser.add_argument("--changed", type=float, default=0.1, help="share of the records changed between runs")
+    parser.add_argument("--runs", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--api-latency", type=float, default=0.0)
+    parser.add_argument("--page-size", type=int, default=0)
+    parser.add_argument("--workloads-per-message", type=int, default=5)
+    parser.add_argument("--shards", type=int, default=1, help="number of shards of the sale queue")
+    parser.add_argument("--engine", choices=("sync", "async"), default="sync")
+    parser.add_argument("--min-rate", type=float, default=0, help="fail below this many sales/sec on the first run")
+    args = parser.parse_args()
+
+    workload = Workload(
+        branches=args.branches,
+        salespersons=args.salespersons,
+        sales=args.sales,
+        skew=args.skew,
+        changed=args.changed,
+        seed=args.seed,
+    )
+    server, calls = workload.serve(latency=args.api_latency)
+    os.environ["API_URL"] = f"http://127.0.0.1:{server.server_port}"
+    salesperson_ids = [
+        employee["id"]
+        for branch_id in range(args.branches)
+        for employee in workload.employees(branch_id)
+        if employee["occupation"] == "salesperson"
+    ]
+    total = sum(len(workload.sales_of(employee_id)) for employee_id in salesperson_ids)
+    print(
+        f"{args.branches} branches, {len(salesperson_ids)} salespersons, {total} sales"
+        f" (means {args.salespersons} x {args.sales}, skew {args.skew})"
+    )
+
+    with mock_aws():
+        from cascading_etl import utils
+
+        services = [load_service(d) for d in ("branches", "salespersons", "sales")]
+        create_tables(utils.get_client("dynamodb"))
+        sqs = utils.get_client("sqs")
+        names = ["employee"] + [f"sale-{shard}" for shard in range(args.shards)]
+        queues = [sqs.create_queue(QueueName=name)["QueueUrl"] for name in names]
+        sale_queues = ",".join(queues[1:])
+        capacity = meter_capacity(utils)
+        common = {
+            "FINGERPRINT_CACHE": "on",
+            "FINGERPRINT_CACHE_TTL": "900",
+            "PAGE_SIZE": str(args.page_size),
+            "DRAIN_SAFETY_MARGIN": "120000",
+        }
+        environments = [
+            dict(common, SQS=queues[0], DB="branch", MAX_CONCURRENCY="10"),
+            dict(
+                common,
+                SOURCE_SQS=queues[0],
+                TARGET_SQS=sale_queues,
+                DB="salesperson",
+                WORKLOADS_PER_MESSAGE=str(args.workloads_per_message),
+            ),
+            dict(
+                common,
+                SQS=sale_queues,
+                DB="sale",
+                CHECKPOINT_DB="checkpoint",
+                ENGINE=args.engine,
+                MAX_CONCURRENCY="5",
+                STREAMING="on",
+            ),
+        ]
+
+        first_rate = None
+        for run in range(args.runs):
+            if run:
+                # the next run sees a share `changed` of the records modified
+                workload.advance()
+            calls.clear()
+            capacity.clear()
+            start = time.perf_counter()
+            latencies, shards = run_cascade(workload, services, queues, environments)
+            elapsed = time.perf_counter() - start
+
+            rate = total / elapsed
+            first_rate = first_rate or rate
+            print(f"run {run + 1}:")
+            print(f"  elapsed:   {elapsed:8.2f} s, {rate:8.1f} sales/sec, {capacity['sale']} sales written")
+            print(f"  API calls: {sum(calls.values())} ({', '.join(f'{k} {v}' for k, v in sorted(calls.items()))})")
+            print(f"  DynamoDB:  {capacity['RCU']} RCU, {capacity['WCU']} WCU")
+            if len(shards) > 1:
+                print(f"  sale messages per shard: {', '.join(str(n) for n in shards)}")
+            print(
+                f"  latency from the branch message to the sales written: "
+                f"p50 {percentile(latencies, 50):.3f} s, p99 {percentile(latencies, 99):.3f} s"
+            )
+    server.shutdown()
+
+    if first_rate < args.min_rate:
+        print(f"below the minimum of {args.min_rate} sales/sec")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Measure the cold start of the three functions: the import of their handler, and their first invocation.
+
+The import is timed with `python -X importtime` in a fresh interpreter, the first invocation against moto and
+`workload.Workload` served as the API. Since moto imports boto3 and requests itself, the first invocation measures
+the handler's own imports, the creation of its clients and its first calls. Either going over its budget in `BUDGETS`
+makes the script exit with 1.
+
+Usage:
+    python benchmarks/bench_cold_start.py --repeat 5
+"""
+import argparse, json, os, statistics, subprocess, sys, time
+
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# milliseconds allowed for the import of the handler and for the first invocation, on a developer machine;
+# 128 MB functions get a fraction of a vCPU, so expect several times more in Lambda
+BUDGETS = {
+    "branches": {"import": 60, "first_call": 400},
+    "salespersons": {"import": 60, "first_call": 400},
+    "sales": {"import": 60, "first_call": 400},
+}
+
+ENVIRONMENT = {
+    "AWS_DEFAULT_REGION": "us-east-1",
+    "AWS_ACCESS_KEY_ID": "testing",
+    "AWS_SECRET_ACCESS_KEY": "testing",
+    "LOGGING_LEVEL": "WARNING",
+    "APP_ENV": "bench",
+    "SQS": "source",
+    "SOURCE_SQS": "source",
+    "TARGET_SQS": "target",
+    "DB": "table",
+}
+
+
+def import_time(function):
+    # cumulative microseconds of `import lambda_function`, as reported by -X importtime
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-X",
+            "importtime",
+            "-c",
+            "import logging; logging.basicConfig(); import lambda_function",
+        ],
+        cwd=os.path.join(root, function),
+        env=dict(os.environ, PYTHONPATH=os.path.join(root, "layer"), **ENVIRONMENT),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and line.split("|")[-1].strip() == "lambda_function":
+            return int(line.split("|")[1]) / 1000
+    raise RuntimeError(result.stderr[-2000:])
+
+
+def first_call(function):
+    result = subprocess.run(
+        [sys.executable, __file__, "--child", function],
+        cwd=os.path.join(root, function),
+        env=dict(os.environ, PYTHONPATH=os.pathsep.join([os.path.join(root, "layer"), os.path.dirname(__file__)]), **ENVIRONMENT),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.splitlines()[-1])["first_call"]
+
+
+def child(function):
+    # set up moto and the API before the handler is imported, then time its first invocation
+    import logging
+    from moto import mock_aws
+    from workload import Workload
+
+    logging.basicConfig()
+    server, _ = Workload(branches=1, salespersons=5, sales=20, skew=0).serve()
+    os.environ["API_URL"] = f"http://127.0.0.1:{server.server_port}"
+
+    with mock_aws():
+        import boto3
+
+        setup = boto3.session.Session()
+        sqs = setup.client("sqs")
+        for name in ("source", "target"):
+            os.environ[name.upper() + "_URL"] = sqs.create_queue(QueueName=name)["QueueUrl"]
+        keys = {
+            "branches": [("branch_id", "HASH")],
+            "salespersons": [("employee_id", "HASH"), ("branch_id", "RANGE")],
+            "sales": [("sale_id", "HASH"), ("employee_id", "RANGE")],
+        }[function]
+        setup.client("dynamodb").create_table(
+            TableName="table",
+            AttributeDefinitions=[{"AttributeName": k, "AttributeType": "S"} for k, _ in keys],
+            KeySchema=[{"AttributeName": k, "KeyType": t} for k, t in keys],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        os.environ["SQS"] = os.environ["SOURCE_SQS"] = os.environ["SOURCE_URL"]
+        os.environ["TARGET_SQS"] = os.environ["TARGET_URL"]
+
+        body = (
+            {"branch_id": 0}
+            if function == "salespersons"
+            else {"branch_id": 0, "employee_id": 0}
+        )
+        event = (
+            {"branches": ["Scranton"]}
+            if function == "branches"
+            else {"Records": [{"messageId": "1", "receiptHandle": "1", "body": envelope(body)}]}
+        )
+
+        class Context:
+            function_name = f"{function}-bench"
+            function_version = "$LATEST"
+
+            def get_remaining_time_in_millis(self):
+                return 900000
+
+        # the function directory, where the Lambda runtime imports the handler from
+        sys.path.insert(0, os.getcwd())
+        start = time.perf_counter()
+        import lambda_function
+
+        response = lambda_function.lambda_handler(event, Context())
+        if response.get("batchItemFailures"):
+            raise RuntimeError(f"the first invocation failed: {response}")
+        elapsed = (time.perf_counter() - start) * 1000
+    server.shutdown()
+    print(json.dumps({"first_call": elapsed}))
+
+
+def envelope(body):
+    # the message body of `envelope.encode`, without importing it before the handler
+    return json.dumps({"v": 1, "stage": "bench", "trace_id": "bench", "enqueued_at": 0, "body": body})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child)
+        return
+
+    over = False
+    for function, budget in BUDGETS.items():
+        imports = statistics.median(import_time(function) for _ in range(args.repeat))
+        calls = statistics.median(first_call(function) for _ in range(args.repeat))
+        flags = [
+            f"{name} over its {budget[name]} ms budget"
+            for name, value in (("import", imports), ("first_call", calls))
+            if value > budget[name]
+        ]
+        over |= bool(flags)
+        print(
+            f"{function:>12}: import {imports:7.1f} ms, import + first call {calls:7.1f} ms"
+            + (f"  <- {', '.join(flags)}" if flags else "")
+        )
+    if over:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""
+Compare the encode/decode throughput of the message envelope with str()/ast.literal_eval.
+
+Usage:
+    python benchmarks/bench_envelope.py --messages 100000
+"""
+import argparse, ast, os, sys, timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "layer"))
+
+from cascading_etl import envelope
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=100000)
+    args = parser.parse_args()
+
+    workload = {"branch_id": "1234", "employee_id": "34646"}
+    legacy, current = str(workload), envelope.encode(workload, "salesperson")
+    runs = (
+        ("str()", lambda: str(workload)),
+        ("ast.literal_eval", lambda: ast.literal_eval(legacy)),
+        ("envelope.encode", lambda: envelope.encode(workload, "salesperson", "trace")),
+        ("envelope.decode", lambda: envelope.decode(current)),
+    )
+    for name, call in runs:
+        elapsed = timeit.timeit(call, number=args.messages)
+        print(f"{name:>16}: {args.messages / elapsed:12.1f} messages/sec")
+
+
+if __name__ == "__main__":
+    main()
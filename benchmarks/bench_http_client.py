@@ -0,0 +1,61 @@
+"""
+Measure requests/sec against a local stub of the API, with and without connection reuse.
+
+Usage:
+    python benchmarks/bench_http_client.py --requests 500
+"""
+import argparse, json, os, sys, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "layer"))
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # keep connections alive between requests
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    body = json.dumps({"result": [{"id": 1, "branch_id": 1, "name": "Scranton"}]}).encode()
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    server = start_stub()
+    os.environ["API_URL"] = f"http://127.0.0.1:{server.server_port}"
+    import requests
+    from cascading_etl import http_client
+
+    path = "/branches/?branch=Scranton"
+    runs = (
+        ("requests.get", lambda: requests.get(http_client.API_URL + path).json()),
+        ("http_client", lambda: http_client.get(path).json()),
+    )
+    for name, call in runs:
+        start = time.perf_counter()
+        for _ in range(args.requests):
+            call()
+        elapsed = time.perf_counter() - start
+        print(f"{name:>12}: {args.requests / elapsed:10.1f} requests/sec")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Measure the deployment packages of the three functions and of the cascading_etl layer, as `sam build` lays them out.
+
+Every package is its code plus the dependencies of its requirements.txt, installed with pip into a temporary
+directory, then zipped like the archives uploaded to Lambda. The layer is installed under python/, where the Lambda
+runtime looks for it. Needs network access to PyPI.
+
+Usage:
+    python benchmarks/bench_package_size.py
+    python benchmarks/bench_package_size.py --max-function-kb 64  # exit with 1 if a function's zip is larger
+"""
+import argparse, os, shutil, subprocess, sys, tempfile, zipfile
+
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+FUNCTIONS = ("branches", "salespersons", "sales")
+
+
+def install(requirements, target):
+    # the dependencies only, like `sam build` does from the requirements.txt next to the code
+    subprocess.run(
+        [sys.executable, "-m", "pip", "install", "-q", "--no-compile", "-r", requirements, "-t", target],
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+
+
+def copy(source, target):
+    shutil.copytree(
+        source,
+        target,
+        dirs_exist_ok=True,
+        ignore=shutil.ignore_patterns("__pycache__", "*.pyc", "*.egg-info"),
+    )
+
+
+def measure(directory):
+    # (unzipped bytes, zipped bytes) of a directory
+    unzipped = 0
+    archive = directory + ".zip"
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as z:
+        for parent, _, files in os.walk(directory):
+            for name in files:
+                path = os.path.join(parent, name)
+                unzipped += os.path.getsize(path)
+                z.write(path, os.path.relpath(path, directory))
+    return unzipped, os.path.getsize(archive)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-function-kb", type=float, default=0, help="fail above this zipped size per function")
+    args = parser.parse_args()
+
+    over = False
+    with tempfile.TemporaryDirectory() as build:
+        packages = []
+        for function in FUNCTIONS:
+            target = os.path.join(build, function)
+            copy(os.path.join(root, function), target)
+            install(os.path.join(root, function, "requirements.txt"), target)
+            packages.append((function, target))
+        target = os.path.join(build, "layer")
+        copy(os.path.join(root, "layer", "cascading_etl"), os.path.join(target, "python", "cascading_etl"))
+        install(os.path.join(root, "layer", "requirements.txt"), os.path.join(target, "python"))
+        packages.append(("layer", target))
+
+        for name, directory in packages:
+            unzipped, zipped = measure(directory)
+            flag = name != "layer" and args.max_function_kb and zipped / 1024 > args.max_function_kb
+            over |= bool(flag)
+            print(
+                f"{name:>12}: {unzipped / 1024:10.1f} KB unzipped, {zipped / 1024:9.1f} KB zipped"
+                + (f"  <- over {args.max_function_kb} KB" if flag else "")
+            )
+    if over:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
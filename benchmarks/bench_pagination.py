@@ -0,0 +1,118 @@
+"""
+Compare reading a paginated employees endpoint page after page and with the next page prefetched.
+
+Usage:
+    python benchmarks/bench_pagination.py --employees 2000 --page-size 200 --api-latency 0.1 --db-latency 0.05
+"""
+import argparse, json, os, sys, threading, time
+from http.server import ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+root = os.path.join(os.path.dirname(__file__), "..")
+sys.path[:0] = [os.path.join(root, "layer"), os.path.join(root, "salespersons")]
+
+from moto import mock_aws
+from bench_http_client import StubHandler
+
+
+def start_stub(latency, count):
+    employees = [
+        {"id": i, "branch_id": "1", "name": f"employee {i}", "occupation": "salesperson"}
+        for i in range(count)
+    ]
+
+    class EmployeesHandler(StubHandler):
+        def do_GET(self):
+            time.sleep(latency)
+            query = parse_qs(urlparse(self.path).query)
+            page, page_size = int(query["page"][0]), int(query["page_size"][0])
+            page_employees = employees[(page - 1) * page_size : page * page_size]
+            self.body = json.dumps({"result": {"employees": page_employees}}).encode()
+            super().do_GET()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), EmployeesHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def slow(call, latency):
+    def wrapper(*args, **kwargs):
+        time.sleep(latency)
+        return call(*args, **kwargs)
+
+    return wrapper
+
+
+def create_table(dynamodb, table_name):
+    dynamodb.create_table(
+        TableName=table_name,
+        AttributeDefinitions=[
+            {"AttributeName": "employee_id", "AttributeType": "S"},
+            {"AttributeName": "branch_id", "AttributeType": "S"},
+        ],
+        KeySchema=[
+            {"AttributeName": "employee_id", "KeyType": "HASH"},
+            {"AttributeName": "branch_id", "KeyType": "RANGE"},
+        ],
+        BillingMode="PAY_PER_REQUEST",
+    )
+
+
+def iter_pages_sequentially(http_client):
+    # how the pages are read without prefetching
+    def iter_pages(path, keys, **kwargs):
+        page = 1
+        while True:
+            params = {http_client.PAGE_PARAM: page, http_client.PAGE_SIZE_PARAM: http_client.page_size}
+            items = list(http_client.iter_items(path, keys, params=params, **kwargs))
+            yield items
+            if len(items) < http_client.page_size:
+                return
+            page += 1
+
+    return iter_pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--employees", type=int, default=2000)
+    parser.add_argument("--page-size", type=int, default=200)
+    parser.add_argument("--api-latency", type=float, default=0.1)
+    parser.add_argument("--db-latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    server = start_stub(args.api_latency, args.employees)
+    os.environ["API_URL"] = f"http://127.0.0.1:{server.server_port}"
+
+    with mock_aws():
+        from cascading_etl import envelope, http_client, utils
+        from service import service
+
+        dynamodb, sqs = utils.get_client("dynamodb"), utils.get_client("sqs")
+        dynamodb.batch_get_item = slow(dynamodb.batch_get_item, args.db_latency)
+        dynamodb.batch_write_item = slow(dynamodb.batch_write_item, args.db_latency)
+        http_client.page_size = args.page_size
+        prefetching = http_client.iter_pages
+
+        for name, iter_pages in (
+            ("sequential", iter_pages_sequentially(http_client)),
+            ("prefetch", prefetching),
+        ):
+            http_client.iter_pages = iter_pages
+            table = f"salesperson-bench-{name}"
+            create_table(dynamodb, table)
+            queue = sqs.create_queue(QueueName=f"sale-queue-{name}")["QueueUrl"]
+            message = {"Body": envelope.encode({"branch_id": "1"}, "branch")}
+
+            start = time.perf_counter()
+            service.process_message(message, queue, table, per_message=25)
+            elapsed = time.perf_counter() - start
+            print(f"{name:>10}: {elapsed:6.2f} s, {args.employees / elapsed:8.1f} employees/sec")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
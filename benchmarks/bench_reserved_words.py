@@ -0,0 +1,48 @@
+"""
+Compare renaming the reserved words of sale records with a list scan and with the memoized frozenset lookup.
+
+Usage:
+    python benchmarks/bench_reserved_words.py --sales 100000
+"""
+import argparse, os, sys, time
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "layer"))
+
+from cascading_etl import utils
+from bench_batch_writer import make_sales
+
+reserved_list = sorted(utils.reserved_words)
+
+
+def rename_with_list(record, prefix):
+    # how the attributes were renamed before
+    attributes = {}
+    for k, v in record.items():
+        if k.upper() not in reserved_list:
+            attributes[k] = v
+        else:
+            attributes[prefix + k] = v
+    return attributes
+
+
+def rename_with_frozenset(record, prefix):
+    return {utils.attribute_name(prefix, k): v for k, v in record.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sales", type=int, default=100000)
+    args = parser.parse_args()
+
+    sales = make_sales(args.sales)
+    for name, rename in (("list", rename_with_list), ("frozenset", rename_with_frozenset)):
+        start = time.perf_counter()
+        for sale in sales:
+            rename(sale, "sale_")
+        elapsed = time.perf_counter() - start
+        print(f"{name:>10}: {len(sales) / elapsed:12.1f} records/sec")
+
+
+if __name__ == "__main__":
+    main()
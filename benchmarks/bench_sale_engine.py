@@ -0,0 +1,104 @@
+"""
+Compare the sync and async engines of the sale collector with stubbed API and DynamoDB latency.
+
+Usage:
+    python benchmarks/bench_sale_engine.py --api-latency 0.2 --db-latency 0.05
+"""
+import argparse, json, os, sys, threading, time
+from datetime import datetime, timedelta
+from http.server import ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+root = os.path.join(os.path.dirname(__file__), "..")
+sys.path[:0] = [os.path.join(root, "layer"), os.path.join(root, "sales")]
+
+from moto import mock_aws
+from bench_batch_writer import create_table
+from bench_http_client import StubHandler
+
+
+def start_stub(latency, sales_per_salesperson):
+    now = datetime.utcnow()
+    sales = [
+        {
+            "id": i,
+            "product": "paper",
+            "quantity": i % 7 + 1,
+            "transaction_timestamp": str(now - timedelta(minutes=i + 1))[:19],
+        }
+        for i in range(sales_per_salesperson)
+    ]
+
+    class SalesHandler(StubHandler):
+        def do_GET(self):
+            time.sleep(latency)
+            employee_id = parse_qs(urlparse(self.path).query)["salespersonsID"][0]
+            self.body = json.dumps(
+                {"result": {"sales": [dict(s, id=f"{employee_id}-{s['id']}") for s in sales]}}
+            ).encode()
+            super().do_GET()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SalesHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def slow(call, latency):
+    def wrapper(*args, **kwargs):
+        time.sleep(latency)
+        return call(*args, **kwargs)
+
+    return wrapper
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--api-latency", type=float, default=0.2)
+    parser.add_argument("--db-latency", type=float, default=0.05)
+    parser.add_argument("--sales", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=5)
+    args = parser.parse_args()
+
+    server = start_stub(args.api_latency, args.sales)
+    os.environ["API_URL"] = f"http://127.0.0.1:{server.server_port}"
+
+    with mock_aws():
+        from cascading_etl import envelope, utils
+        from service import service
+
+        dynamodb, sqs = utils.get_client("dynamodb"), utils.get_client("sqs")
+        dynamodb.batch_get_item = slow(dynamodb.batch_get_item, args.db_latency)
+        dynamodb.batch_write_item = slow(dynamodb.batch_write_item, args.db_latency)
+
+        for engine in ("sync", "async"):
+            table = f"sale-bench-{engine}"
+            create_table(dynamodb, table)
+            queue = sqs.create_queue(QueueName=f"sale-queue-{engine}")["QueueUrl"]
+            for employee_id in range(10):
+                workload = {"branch_id": 1, "employee_id": employee_id}
+                utils.deliver_message(queue, envelope.encode(workload, "salesperson"))
+
+            environment = {
+                "SQS": queue,
+                "DB": table,
+                "CHECKPOINT_DB": "",
+                "FINGERPRINT_CACHE": "off",
+                "FINGERPRINT_CACHE_TTL": "0",
+                "ENGINE": engine,
+                "MAX_CONCURRENCY": str(args.concurrency),
+                "STREAMING": "on",
+                "PAGE_SIZE": "0",
+            }
+            start = time.perf_counter()
+            service.main({}, environment)
+            elapsed = time.perf_counter() - start
+            written = dynamodb.scan(TableName=table, Select="COUNT")["Count"]
+            print(f"{engine:>6}: {elapsed:6.2f} s, {written / elapsed:8.1f} sales/sec")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
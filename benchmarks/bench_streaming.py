@@ -0,0 +1,101 @@
+"""
+Compare the peak RSS of fetching the sales of a salesperson with a streamed and a whole response.
+
+Usage:
+    python benchmarks/bench_streaming.py --sales 200000
+"""
+import argparse, json, os, random, subprocess, sys, threading, time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+root = os.path.join(os.path.dirname(__file__), "..")
+sys.path[:0] = [os.path.join(root, "layer"), os.path.join(root, "sales")]
+
+
+def make_body(n):
+    random.seed(0)
+    now = datetime.utcnow().replace(microsecond=0)
+    # two years of history, of which about 1/730 falls in the last 24 hours
+    sales = [
+        {
+            "id": i,
+            "product": "paper",
+            "quantity": random.randrange(1, 100),
+            "price": round(random.uniform(1, 500), 2),
+            "transaction_timestamp": str(
+                now - timedelta(seconds=random.randrange(2 * 365 * 24 * 3600))
+            ),
+        }
+        for i in range(n)
+    ]
+    return json.dumps({"result": {"sales": sales}}).encode()
+
+
+def start_stub(body):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def peak_rss():
+    # high-water mark of the resident set in KiB; unlike ru_maxrss, it isn't inherited from the parent across exec
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1])
+
+
+def fetch(streaming):
+    # run in a child process, so that its peak RSS is the one of a single fetch
+    from service import service
+    from cascading_etl import http_client
+
+    http_client.streaming = streaming
+    baseline = peak_rss()
+    start = time.perf_counter()
+    kept = service.fetch_salesperson_sales({"branch_id": "1", "employee_id": "1"})
+    elapsed = time.perf_counter() - start
+    peak = peak_rss()
+    print(
+        f"{'stream' if streaming else 'whole':>7}: peak RSS {peak / 1024:6.1f} MiB"
+        f" (+{(peak - baseline) / 1024:5.1f} MiB over the imports),"
+        f" {elapsed:6.2f} s, {len(kept)} kept"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sales", type=int, default=200000)
+    parser.add_argument("--child", choices=("stream", "whole"))
+    args = parser.parse_args()
+
+    if args.child:
+        fetch(args.child == "stream")
+        return
+
+    body = make_body(args.sales)
+    print(f"response: {len(body) / 2 ** 20:.1f} MiB, {args.sales} sales")
+    server = start_stub(body)
+    env = dict(os.environ, API_URL=f"http://127.0.0.1:{server.server_port}")
+    for mode in ("whole", "stream"):
+        subprocess.run([sys.executable, __file__, "--child", mode], env=env, check=True)
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
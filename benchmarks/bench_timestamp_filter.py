@@ -0,0 +1,59 @@
+"""
+Compare filtering sales on the last 24 hours with strptime and with string comparison.
+
+Usage:
+    python benchmarks/bench_timestamp_filter.py --sales 100000
+"""
+import argparse, os, random, sys, time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+root = os.path.join(os.path.dirname(__file__), "..")
+sys.path[:0] = [os.path.join(root, "layer"), os.path.join(root, "sales")]
+
+from service import service
+
+
+def filter_with_strptime(sales, now):
+    # how the sales were filtered before
+    recent_sales = []
+    for sale in sales:
+        sale_timestamp = datetime.strptime(
+            sale["transaction_timestamp"], service.TIMESTAMP_FORMAT
+        )
+        if now - timedelta(hours=24) <= sale_timestamp and sale_timestamp < now:
+            recent_sales.append(sale)
+    return recent_sales
+
+
+def filter_with_strings(sales, now):
+    start = (now - timedelta(hours=24)).strftime(service.TIMESTAMP_FORMAT)
+    return service.filter_window(sales, start, now.strftime(service.TIMESTAMP_FORMAT))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sales", type=int, default=100000)
+    args = parser.parse_args()
+
+    random.seed(0)
+    now = datetime.utcnow().replace(microsecond=0)
+    # two years of history, of which about 1/730 falls in the last 24 hours
+    sales = [
+        {
+            "id": i,
+            "transaction_timestamp": str(
+                now - timedelta(seconds=random.randrange(2 * 365 * 24 * 3600))
+            ),
+        }
+        for i in range(args.sales)
+    ]
+    for name, window in (("strptime", filter_with_strptime), ("strings", filter_with_strings)):
+        start = time.perf_counter()
+        kept = window(sales, now)
+        elapsed = time.perf_counter() - start
+        print(f"{name:>9}: {len(sales) / elapsed:12.1f} sales/sec, {len(kept)} kept")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,338 @@
+"""
+Generate seeded synthetic data in the shapes of the Dunder Mifflin API, served from a local stub or dumped to files.
+
+Usage:
+    python benchmarks/workload.py dump data/ --branches 1000 --salespersons 20 --sales 100
+    python benchmarks/workload.py serve --port 8000 --branches 13 --changed 0.1
+
+    from workload import Workload
+    workload = Workload(branches=1000, salespersons=20, sales=100, skew=1.0, changed=0.05)
+    server, calls = workload.serve(latency=0.02)
+    ...
+    workload.advance()  # the next run, where 5% of the records changed
+"""
+import argparse, json, math, os, random, threading, time
+from collections import Counter
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# the branches of the API, numbered branches are made up past them
+BRANCH_NAMES = [
+    "Scranton",
+    "Akron",
+    "Buffalo",
+    "Rochester",
+    "Syracuse",
+    "Utica",
+    "Binghamton",
+    "Albany",
+    "Nashua",
+    "Pittsfield",
+    "Stamford",
+    "Yonkers",
+    "New York",
+]
+# occupations of the employees who aren't salespersons
+OTHER_OCCUPATIONS = ["accountant", "receptionist", "warehouse"]
+PRODUCTS = ["paper", "cardstock", "envelopes", "labels", "printer ink"]
+# format of the `transaction_timestamp` of the sales, as parsed by the sale collector
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+class Workload:
+    """
+    A deterministic data set of branches, employees and sales.
+
+    Args:
+        branches (int): The number of branches (default: 13).
+        salespersons (int): The mean number of salespersons per branch (default: 10).
+        sales (int): The mean number of sales per salesperson (default: 20).
+        others (int): The number of employees per branch who aren't salespersons (default: 2).
+        skew (float): The spread of the salespersons per branch and of the sales per salesperson, drawn from
+            a log-normal distribution of that sigma around their mean; 0 for the same everywhere (default: 1.0).
+        changed (float): The share of records that change from a generation to the next (default: 0.1).
+        hours (int): The number of hours the sales are spread over, back from `now` (default: 24).
+        seed (int): The seed of the data set (default: 0).
+        now (datetime): The time the sales are spread back from, the current time if None (default: None).
+
+    Notes:
+        - Every branch, employee and sale is drawn from a random generator seeded by its own ID,
+          so any part of the data set is generated on demand, in any order, without the rest.
+        - The data set is the same for the same arguments, given the same `now`.
+        - `advance` moves to the next generation, the data as the API would return it on the next run.
+
+    """
+
+    def __init__(
+        self,
+        branches=13,
+        salespersons=10,
+        sales=20,
+        others=2,
+        skew=1.0,
+        changed=0.1,
+        hours=24,
+        seed=0,
+        now=None,
+    ):
+        self.branches = branches
+        self.salespersons = salespersons
+        self.sales = sales
+        self.others = others
+        self.skew = skew
+        self.changed = changed
+        self.hours = hours
+        self.seed = seed
+        self.now = now or datetime.utcnow().replace(microsecond=0)
+        self.generation = 0
+
+    def advance(self):
+        """Move to the next generation of the data set, where a share `changed` of the records differ."""
+        self.generation += 1
+
+    def branch_names(self):
+        """List the names of the branches."""
+        return [self.branch_name(i) for i in range(self.branches)]
+
+    def branch_name(self, branch_id):
+        if branch_id < len(BRANCH_NAMES):
+            return BRANCH_NAMES[branch_id]
+        return f"Branch {branch_id}"
+
+    def branch(self, name):
+        """The `result` of /branches/?branch=<name>, empty for an unknown branch."""
+        names = self.branch_names()
+        if name not in names:
+            return []
+        branch_id = names.index(name)
+        rng = self._random("branch", branch_id)
+        return [
+            {
+                "id": branch_id,
+                "branch_id": branch_id,
+                "name": name,
+                "phone": f"570-555-{rng.randrange(10000):04d}",
+                "revision": self._revision("branch", branch_id),
+            }
+        ]
+
+    def employees(self, branch_id):
+        """The `result.employees` of /employees?branchID=<branch_id>."""
+        if not 0 <= branch_id < self.branches:
+            return []
+        count = self._count(self.salespersons, "branch", branch_id)
+        employees = []
+        for i in range(count + self.others):
+            employee_id = branch_id * 100000 + i
+            rng = self._random("employee", employee_id)
+            employees.append(
+                {
+                    "id": employee_id,
+                    "branch_id": branch_id,
+                    "name": f"employee {employee_id}",
+                    "occupation": "salesperson"
+                    if i < count
+                    else OTHER_OCCUPATIONS[i % len(OTHER_OCCUPATIONS)],
+                    "hired": rng.randrange(1990, 2010),
+                    "revision": self._revision("employee", employee_id),
+                }
+            )
+        return employees
+
+    def sales_of(self, employee_id, since=None):
+        """The `result.sales` of /sales/?salespersonsID=<employee_id>, optionally since a timestamp."""
+        branch_id, index = divmod(employee_id, 100000)
+        if not 0 <= branch_id < self.branches or index >= self._count(
+            self.salespersons, "branch", branch_id
+        ):
+            return []
+        count = self._count(self.sales, "employee", employee_id)
+        rng = self._random("sales", employee_id)
+        sales = []
+        for i in range(count):
+            sale_id = f"{employee_id}-{i}"
+            timestamp = (
+                self.now - timedelta(seconds=rng.randrange(self.hours * 3600))
+            ).strftime(TIMESTAMP_FORMAT)
+            quantity = rng.randrange(1, 100)
+            unit_cents = rng.randrange(100, 5000)
+            if since and timestamp <= since:
+                continue
+            sales.append(
+                {
+                    "id": sale_id,
+                    "product": PRODUCTS[quantity % len(PRODUCTS)],
+                    "quantity": quantity,
+                    "amount_cents": quantity * unit_cents,
+                    "transaction_timestamp": timestamp,
+                    "revision": self._revision("sale", sale_id),
+                }
+            )
+        return sales
+
+    def response(self, path):
+        """
+        Answer a request to the API.
+
+        Args:
+            path (str): The path of the request, including the query string.
+
+        Returns:
+            dict: The JSON document the API would answer, paginated with `page` and `page_size` if given.
+
+        """
+        url = urlparse(path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        endpoint = url.path.strip("/")
+        if endpoint == "branches":
+            result = self.branch(query.get("branch"))
+            return {"result": self._page(result, query)}
+        if endpoint == "employees":
+            employees = self.employees(int(query["branchID"]))
+            return {"result": {"employees": self._page(employees, query)}}
+        if endpoint == "sales":
+            sales = self.sales_of(int(query["salespersonsID"]), query.get("since"))
+            return {"result": {"sales": self._page(sales, query)}}
+        raise KeyError(endpoint)
+
+    def serve(self, host="127.0.0.1", port=0, latency=0.0):
+        """
+        Serve the data set from a local stub of the API, in a background thread.
+
+        Args:
+            host (str): The address to listen on (default: "127.0.0.1").
+            port (int): The port to listen on, any free one if 0 (default: 0).
+            latency (float): The number of seconds every response is delayed by (default: 0.0).
+
+        Returns:
+            Tuple[ThreadingHTTPServer, Counter]: The server, to point `API_URL` to and shut down,
+            and the number of calls per endpoint.
+
+        """
+        workload, calls = self, Counter()
+
+        class Handler(BaseHTTPRequestHandler):
+            # keep connections alive between requests
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                time.sleep(latency)
+                calls[urlparse(self.path).path.strip("/")] += 1
+                try:
+                    body = json.dumps(workload.response(self.path)).encode()
+                    status = 200
+                except (KeyError, ValueError):
+                    body, status = b'{"error": "not found"}', 404
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server, calls
+
+    def dump(self, directory):
+        """
+        Write the responses of the API to files, one per request.
+
+        Args:
+            directory (str): The directory to write to, as branches/<name>.json, employees/<branch_id>.json
+                and sales/<employee_id>.json.
+
+        Returns:
+            int: The number of files written.
+
+        """
+        written = 0
+        for endpoint in ("branches", "employees", "sales"):
+            os.makedirs(os.path.join(directory, endpoint), exist_ok=True)
+        for branch_id, name in enumerate(self.branch_names()):
+            self._dump(directory, "branches", name, {"result": self.branch(name)})
+            employees = self.employees(branch_id)
+            self._dump(directory, "employees", branch_id, {"result": {"employees": employees}})
+            written += 2
+            for employee in employees:
+                if employee["occupation"] == "salesperson":
+                    sales = self.sales_of(employee["id"])
+                    self._dump(directory, "sales", employee["id"], {"result": {"sales": sales}})
+                    written += 1
+        return written
+
+    def _dump(self, directory, endpoint, name, document):
+        with open(os.path.join(directory, endpoint, f"{name}.json"), "w") as f:
+            json.dump(document, f, separators=(",", ":"))
+
+    def _random(self, kind, key):
+        return random.Random(f"{self.seed}/{kind}/{key}")
+
+    def _count(self, mean, kind, key):
+        # log-normal around the mean, so a few branches and salespersons get much more than the others
+        if not self.skew:
+            return mean
+        factor = self._random(f"count/{kind}", key).lognormvariate(0, self.skew)
+        return max(1, round(mean * factor / math.exp(self.skew ** 2 / 2)))
+
+    def _revision(self, kind, key):
+        # the generation a record last changed in, among the `generation` runs so far
+        revision = 0
+        for generation in range(1, self.generation + 1):
+            if self._random(f"changed/{kind}/{generation}", key).random() < self.changed:
+                revision = generation
+        return revision
+
+    def _page(self, items, query):
+        if "page" not in query:
+            return items
+        number, size = int(query["page"]), int(query["page_size"])
+        return items[(number - 1) * size : number * size]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("command", choices=("dump", "serve"))
+    parser.add_argument("directory", nargs="?", default="workload")
+    parser.add_argument("--branches", type=int, default=13)
+    parser.add_argument("--salespersons", type=int, default=10)
+    parser.add_argument("--sales", type=int, default=20)
+    parser.add_argument("--skew", type=float, default=1.0)
+    parser.add_argument("--changed", type=float, default=0.1)
+    parser.add_argument("--generation", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--now", help=f"the time the sales are spread back from, as {TIMESTAMP_FORMAT}")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    workload = Workload(
+        branches=args.branches,
+        salespersons=args.salespersons,
+        sales=args.sales,
+        skew=args.skew,
+        changed=args.changed,
+        seed=args.seed,
+        now=datetime.strptime(args.now, TIMESTAMP_FORMAT) if args.now else None,
+    )
+    workload.generation = args.generation
+    if args.command == "dump":
+        print(f"{workload.dump(args.directory)} files written to {args.directory}")
+        return
+
+    server, _ = workload.serve(port=args.port, latency=args.latency)
+    print(f"serving on http://127.0.0.1:{server.server_port}, API_URL to point the collectors to it")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
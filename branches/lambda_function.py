@@ -1,5 +1,6 @@
 import json
 import logging
+from cascading_etl import metrics
 from pythonjsonlogger import jsonlogger
 from service import service, config
 
@@ -45,6 +46,10 @@ def lambda_handler(event, context):
 
     """
     LOGGER.info("Starting lambda executing.", extra=_lambda_context(context))
-    service.main(event, ENV)
+    try:
+        service.main(event, ENV)
+    finally:
+        # one EMF document per invocation, with the time spent in the API, DynamoDB and SQS
+        metrics.flush(context.function_name)
     LOGGER.info("Successful lambda execution.", extra=_lambda_context(context))
     return {"statusCode": 200}
@@ -1,8 +1,4 @@
-import os
-import sys
-import logging
-
-LOGGER = logging.getLogger(__name__)
+from cascading_etl.config import read_env
 
 
 def load_env():
@@ -20,16 +16,25 @@ def load_env():
             - APP_ENV: Specifies the application environment.
             - SQS: Specifies the SQS environment variable.
             - DB: Specifies the DB environment variable.
+        - Optional environment variables fall back to a default:
+            - FINGERPRINT_CACHE: "on" or "off", whether fingerprints are cached across invocations (default: "on").
+            - FINGERPRINT_CACHE_TTL: The number of seconds a cached fingerprint is trusted for (default: "900").
+            - MAX_CONCURRENCY: The maximum number of branches processed at the same time (default: "10").
+            - PAGE_SIZE: The number of items requested per page from the API, "0" for endpoints answering in a single response (default: "0").
         - If any of the required environment variables are missing, a KeyError is raised.
         - The function logs an exception message indicating the missing environment variable and exits the program with a status code of 1.
     """
-    try:
-        return {
-            "LOGGING_LEVEL": os.environ["LOGGING_LEVEL"],
-            "APP_ENV": os.environ["APP_ENV"],
-            "SQS": os.environ["SQS"],
-            "DB": os.environ["DB"],
-        }
-    except KeyError as error:
-        LOGGER.exception("Enviroment variable %s is required.", error)
-        sys.exit(1)
+    return read_env(
+        required=(
+            "LOGGING_LEVEL",
+            "APP_ENV",
+            "SQS",
+            "DB",
+        ),
+        optional={
+            "FINGERPRINT_CACHE": "on",
+            "FINGERPRINT_CACHE_TTL": "900",
+            "MAX_CONCURRENCY": "10",
+            "PAGE_SIZE": "0",
+        },
+    )
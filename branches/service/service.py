@@ -1,6 +1,7 @@
-import logging, requests, sys
-from utils import *
-from boto3.dynamodb.conditions import Key
+import logging, sys
+from cascading_etl import http_client, pipeline
+from concurrent.futures import ThreadPoolExecutor
+from cascading_etl.utils import *
 
 LOGGER = logging.getLogger(__name__)
 
@@ -16,12 +17,13 @@ def main(event, environment):
         None
 
     Raises:
-        SystemExit: If an exception occurs during the execution.
+        SystemExit: If an exception occurs while processing any of the branches.
 
     Notes:
         - If `event` does not contain the 'branches' key, the function will default to processing information for all branches.
-        - The function retrieves branch-specific information from a URL and updates the DynamoDB table accordingly.
+        - The function retrieves branch-specific information from a URL and updates the DynamoDB table accordingly, see `process_branch`.
         - The updated information is then delivered to an SQS queue for further processing.
+        - Up to `MAX_CONCURRENCY` branches are processed at the same time, and a failing branch doesn't stop the others.
 
     """
     LOGGER.info(event)
@@ -48,28 +50,63 @@ def main(event, environment):
 
     queue = environment["SQS"]
     table = environment["DB"]
+    fingerprint_cache.enabled = environment["FINGERPRINT_CACHE"] == "on"
+    fingerprint_cache.ttl = int(environment["FINGERPRINT_CACHE_TTL"])
+    http_client.page_size = int(environment["PAGE_SIZE"])
 
-    try:
-        for branch in branches:
-            # go to a path that allows users to retrieve all information of the specified branch(es) based on input date range
-            response = requests.get(
-                url=f"www.dundermifflinpaper.com/branches/?branch={branch}"
-            )
-            response = response.json()
-            branches = response.get("result")
-            for result in branches:
-                if not upToDate(
-                    table,
-                    Key("branch_id").eq(str(result["id"])),
-                    result,
-                    "branch_",
-                ):
-                    # only update DynamoDB table when it's NOT complete ingesting
-                    update_info(table, result)
-
-            deliver_message(queue, str({"branch": result["branch_id"]}))
-            LOGGER.info(f"sending branch {result['branch_id']} for the next stage")
-
-    except Exception as e:
-        LOGGER.error(str(e), exc_info=True)
+    # branches are independent, so they are fetched and persisted concurrently
+    with ThreadPoolExecutor(
+        max_workers=int(environment["MAX_CONCURRENCY"])
+    ) as executor:
+        futures = {
+            executor.submit(process_branch, branch, queue, table): branch
+            for branch in branches
+        }
+
+    failures = 0
+    for future, branch in futures.items():
+        try:
+            future.result()
+        except Exception as e:
+            # one failing branch doesn't prevent the others from being processed
+            LOGGER.error(f"failed to process branch {branch}: {e}", exc_info=True)
+            failures += 1
+
+    LOGGER.info("fingerprint cache usage", extra=fingerprint_cache.stats())
+    if failures:
         sys.exit(1)
+
+
+def process_branch(branch, queue, table):
+    """Update the DynamoDB table with a branch and deliver it to the next stage.
+
+    Args:
+        branch (str): The name of the branch, e.g. "Scranton".
+        queue (str): The URL of the SQS queue of the next stage.
+        table (str): The name of the DynamoDB table of branches.
+
+    Returns:
+        None
+
+    Notes:
+        - The API is read page by page with `http_client.iter_pages`, the next page being fetched while the current one is diffed and written.
+        - The branch flows through the `pipeline` stages: it's written by `upsert` if its fingerprint changed,
+          a single conditional write rather than a read and a write, before being delivered by `emit`.
+        - Exceptions are left to the caller, including a ValueError if the API knows no such branch.
+
+    """
+    # go to a path that allows users to retrieve all information of the specified branch(es) based on input date range
+    pages = http_client.iter_pages(f"/branches/?branch={branch}", ("result",))
+    fetched = []
+    # only update DynamoDB table when it's NOT complete ingesting
+    pipeline.run(
+        pipeline.source(pages),
+        pipeline.each(fetched.append),
+        pipeline.upsert(table, "branch_"),
+    )
+    if not fetched:
+        raise ValueError(f"branch {branch} not found")
+    # the branch is persisted before being handed over to the next stage
+    branch_id = fetched[-1]["branch_id"]
+    pipeline.run([{"branch_id": branch_id}], pipeline.emit(queue, "branch"))
+    LOGGER.info(f"sending branch {branch_id} for the next stage")
@@ -0,0 +1,9 @@
+"""
+Modules shared by the collectors, deployed once as a Lambda layer.
+
+Nothing is imported here, so that a function only pays for the modules it uses:
+
+    from cascading_etl import envelope, http_client, metrics, pipeline
+    from cascading_etl.utils import *
+"""
+__version__ = "1.0.0"
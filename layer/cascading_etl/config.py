@@ -0,0 +1,29 @@
+import os, sys, logging
+
+LOGGER = logging.getLogger(__name__)
+
+
+def read_env(required, optional=None):
+    """
+    Read the environment variables of a collector.
+
+    Args:
+        required (Iterable[str]): The names of the environment variables that must be set.
+        optional (dict): The names of the environment variables that may be set, mapped to their default (default: None).
+
+    Returns:
+        dict: The value of every required and optional environment variable, by name.
+
+    Notes:
+        - If any of the required environment variables is missing, the function logs it and exits the program with
+          a status code of 1, so that the function fails at init rather than on its first record.
+
+    """
+    try:
+        env = {name: os.environ[name] for name in required}
+    except KeyError as error:
+        LOGGER.exception("Enviroment variable %s is required.", error)
+        sys.exit(1)
+    for name, default in (optional or {}).items():
+        env[name] = os.environ.get(name, default)
+    return env
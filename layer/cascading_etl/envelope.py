@@ -0,0 +1,118 @@
+import ast, json, time, uuid
+
+# version of the envelope written by `encode`
+VERSION = 1
+# maximum size in bytes of an SQS message
+MAX_MESSAGE_SIZE = 262144
+
+
+def encode(body, stage, trace_id=None):
+    """
+    Wrap the body of a message in a versioned envelope, serialized as compact JSON.
+
+    Args:
+        body (dict): The payload handed over to the next stage, e.g. {"branch_id": "1", "employee_id": "2"}.
+        stage (str): The stage producing the message, e.g. "branch" or "salesperson".
+        trace_id (str): The ID shared by all the messages stemming from the same branch, a new one if None (default: None).
+
+    Returns:
+        str: The message body to send to SQS.
+
+    """
+    return json.dumps(
+        {
+            "v": VERSION,
+            "stage": stage,
+            "trace_id": trace_id or uuid.uuid4().hex,
+            "enqueued_at": round(time.time(), 3),
+            "body": body,
+        },
+        separators=(",", ":"),
+    )
+
+
+def decode(message_body):
+    """
+    Unwrap a message body produced by `encode`.
+
+    Args:
+        message_body (str): The body of the SQS message.
+
+    Returns:
+        dict: The envelope, with its 'version', 'stage', 'trace_id', 'enqueued_at' and 'body'.
+
+    Notes:
+        - Messages sent before the envelope existed hold `str(dict)`; they are still parsed with `ast.literal_eval`
+          and reported as version 0, without stage, trace ID or enqueue time.
+
+    """
+    try:
+        envelope = json.loads(message_body)
+    except ValueError:
+        return {
+            "version": 0,
+            "stage": None,
+            "trace_id": None,
+            "enqueued_at": None,
+            "body": ast.literal_eval(message_body),
+        }
+
+    return {
+        "version": envelope["v"],
+        "stage": envelope["stage"],
+        "trace_id": envelope["trace_id"],
+        "enqueued_at": envelope["enqueued_at"],
+        "body": envelope["body"],
+    }
+
+
+def pack(workloads, stage, trace_id=None, per_message=1):
+    """
+    Encode workloads into message bodies holding several workloads each.
+
+    Args:
+        workloads (List[dict]): The payloads handed over to the next stage.
+        stage (str): The stage producing the messages.
+        trace_id (str): The ID shared by all the messages stemming from the same branch, a new one if None (default: None).
+        per_message (int): The maximum number of workloads per message (default: 1).
+
+    Returns:
+        List[str]: The message bodies to send to SQS.
+
+    Notes:
+        - Several workloads are sent as {"workloads": [...]}, a single one keeps the shape of `encode`.
+        - A message going over `MAX_MESSAGE_SIZE` is split in halves until every half fits.
+
+    """
+    trace_id = trace_id or uuid.uuid4().hex
+    bodies = []
+    for start in range(0, len(workloads), per_message):
+        bodies += _pack(workloads[start : start + per_message], stage, trace_id)
+    return bodies
+
+
+def _pack(workloads, stage, trace_id):
+    if len(workloads) == 1:
+        return [encode(workloads[0], stage, trace_id)]
+
+    message_body = encode({"workloads": workloads}, stage, trace_id)
+    if len(message_body.encode("utf-8")) <= MAX_MESSAGE_SIZE:
+        return [message_body]
+    half = len(workloads) // 2
+    return _pack(workloads[:half], stage, trace_id) + _pack(
+        workloads[half:], stage, trace_id
+    )
+
+
+def unpack(envelope):
+    """
+    List the workloads of an envelope returned by `decode`.
+
+    Args:
+        envelope (dict): The decoded envelope.
+
+    Returns:
+        List[dict]: The workloads, whether the message holds one or several.
+
+    """
+    return envelope["body"].get("workloads", [envelope["body"]])
@@ -0,0 +1,311 @@
+import codecs, json, logging, os, threading, time
+from cascading_etl import metrics
+
+LOGGER = logging.getLogger(__name__)
+
+# the Dunder Mifflin API, overridable to point the collectors at a local stub
+API_URL = os.environ.get("API_URL", "https://www.dundermifflinpaper.com")
+
+# (connect, read) timeouts in seconds
+TIMEOUT = (3.05, 30)
+# connections kept alive to the API
+POOL_SIZE = 10
+# arguments of the urllib3 Retry of failed connections and 429/5xx responses
+RETRIES = dict(
+    total=5,
+    backoff_factor=0.5,
+    status_forcelist=(429, 500, 502, 503, 504),
+)
+
+# query parameters of the page number, from 1, and of the number of items per page
+PAGE_PARAM = "page"
+PAGE_SIZE_PARAM = "page_size"
+# maximum number of pages read by `iter_pages`, in case the API never returns a short page
+MAX_PAGES = 1000
+
+# whether `iter_items` streams responses rather than loading them whole
+streaming = True
+# number of items requested per page by `iter_pages`, 0 to get everything in a single response
+page_size = 0
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """
+    Get the HTTP session shared by every call to the API in this container.
+
+    Returns:
+        requests.Session: The session, created on first use.
+
+    Notes:
+        - The session keeps up to `POOL_SIZE` connections alive, so consecutive calls skip the TCP/TLS handshake.
+        - Failed connections and 429/5xx responses are retried with exponential backoff according to `RETRIES`.
+        - Responses are requested gzip-compressed.
+        - requests is only imported here, so that importing this module costs nothing on cold start.
+        - The session is built under a lock, so threads calling the API concurrently on a cold start share one.
+
+    """
+    global _session
+    session = _session
+    if session is None:
+        with _session_lock:
+            session = _session
+            if session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                from urllib3.util.retry import Retry
+
+                adapter = HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=POOL_SIZE,
+                    max_retries=Retry(**RETRIES),
+                )
+                session = requests.Session()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers.update({"Accept-Encoding": "gzip"})
+                _session = session
+    return session
+
+
+def get(path, **kwargs):
+    """
+    Send a GET request to the API.
+
+    Args:
+        path (str): The path of the endpoint, including the query string, e.g. "/branches/?branch=Scranton".
+        **kwargs: Extra arguments passed on to `requests.Session.get`.
+
+    Returns:
+        requests.Response: The response of the API.
+
+    Raises:
+        requests.exceptions.RetryError: If the API still answers with a status of `RETRIES` once the retries are exhausted.
+        requests.ConnectionError: If the API still can't be reached once the retries are exhausted.
+        requests.HTTPError: If the API answers with another error status, e.g. 404.
+
+    Notes:
+        - The request is timed as "ApiRequest" in `metrics`, up to the headers when the response is streamed;
+          `iter_items` times the rest of the response as "ApiDownload".
+
+    """
+    kwargs.setdefault("timeout", TIMEOUT)
+    with metrics.timer("ApiRequest"):
+        response = get_session().get(API_URL + path, **kwargs)
+    response.raise_for_status()
+    return response
+
+
+def iter_items(path, keys, chunk_size=65536, **kwargs):
+    """
+    Iterate over the items of an array nested in the JSON response of the API.
+
+    Args:
+        path (str): The path of the endpoint, including the query string.
+        keys (tuple): The keys leading to the array, e.g. ("result", "sales") for {"result": {"sales": [...]}}.
+        chunk_size (int): The number of bytes read from the response at a time when streaming (default: 65536).
+        **kwargs: Extra arguments passed on to `requests.Session.get`.
+
+    Yields:
+        Any: The items of the array, nothing if the array doesn't exist.
+
+    Notes:
+        - While `streaming` is True, the response is read chunk by chunk and only the items of the array are decoded,
+          one at a time, so memory is bounded by a chunk and an item rather than by the whole response.
+        - Otherwise the response is decoded whole with `response.json()`.
+        - Reading and decoding the body is timed as "ApiDownload" in `metrics`, leaving out the time spent
+          by the caller between two items.
+
+    """
+    if not streaming:
+        response = get(path, **kwargs)
+        with metrics.timer("ApiDownload"):
+            document = response.json()
+        for key in keys:
+            document = (document or {}).get(key)
+        yield from document or []
+        return
+
+    response = get(path, stream=True, **kwargs)
+    try:
+        yield from _timed(
+            _iter_array(response.iter_content(chunk_size), tuple(keys)), "ApiDownload"
+        )
+    finally:
+        response.close()
+
+
+def _timed(items, name):
+    # the time spent producing the items, not the time the consumer spends on them
+    elapsed = 0.0
+    try:
+        start = time.perf_counter()
+        for item in items:
+            elapsed += time.perf_counter() - start
+            yield item
+            start = time.perf_counter()
+        elapsed += time.perf_counter() - start
+    finally:
+        metrics.record(name, elapsed * 1000)
+
+
+def iter_pages(path, keys, **kwargs):
+    """
+    Iterate over the pages of an array nested in the JSON responses of the API.
+
+    Args:
+        path (str): The path of the endpoint, including the query string.
+        keys (tuple): The keys leading to the array in each response, e.g. ("result", "sales").
+        **kwargs: Extra arguments passed on to `requests.Session.get`.
+
+    Yields:
+        Iterable: The items of each page.
+
+    Notes:
+        - While `page_size` is 0, the whole array is yielded as a single page, streamed by `iter_items`.
+        - Otherwise pages are requested with `PAGE_PARAM` and `PAGE_SIZE_PARAM` until one comes back short,
+          and page N+1 is fetched in the background while page N is consumed.
+        - An endpoint that ignores the page parameters returns the same full page over and over, so the pages
+          also stop at an empty page, at a page starting with the same item as the previous one, which isn't
+          yielded, and after `MAX_PAGES` pages.
+
+    """
+    if not page_size:
+        yield iter_items(path, keys, **kwargs)
+        return
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    params = dict(kwargs.pop("params", None) or {})
+
+    def fetch(page):
+        params_page = dict(params, **{PAGE_PARAM: page, PAGE_SIZE_PARAM: page_size})
+        with metrics.timer("ApiPage"):
+            return list(iter_items(path, keys, params=params_page, **kwargs))
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        page = 1
+        prefetched = executor.submit(fetch, page)
+        first = None
+        while prefetched is not None:
+            items = prefetched.result()
+            prefetched = None
+            if not items:
+                return
+            if page > 1 and items[0] == first:
+                LOGGER.warning(
+                    f"page {page} of {path} repeats page {page - 1}, the API seems to ignore {PAGE_PARAM}"
+                )
+                return
+            first = items[0]
+            if len(items) >= page_size:
+                if page < MAX_PAGES:
+                    page += 1
+                    prefetched = executor.submit(fetch, page)
+                else:
+                    LOGGER.warning(f"stopped reading {path} after {MAX_PAGES} pages")
+            yield items
+
+
+def _iter_array(chunks, keys):
+    chunks = iter(chunks)
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    scanner = json.JSONDecoder()
+    state = {"buffer": "", "pos": 0, "exhausted": False}
+
+    def read():
+        # append the next chunk, dropping what's already consumed
+        chunk = next(chunks, None)
+        if chunk is None:
+            state["exhausted"] = True
+            text = decoder.decode(b"", final=True)
+        else:
+            text = decoder.decode(chunk)
+        state["buffer"] = state["buffer"][state["pos"] :] + text
+        state["pos"] = 0
+
+    # skip the document up to the array, keeping track of the keys leading to each container:
+    # every entry of `stack` is [container, current key, whether a key is expected next]
+    stack = []
+    while True:
+        buffer, pos = state["buffer"], state["pos"]
+        if pos >= len(buffer):
+            if state["exhausted"]:
+                return
+            read()
+            continue
+
+        c = buffer[pos]
+        if c == '"':
+            end = _string_end(buffer, pos)
+            if end is None:
+                if state["exhausted"]:
+                    return
+                read()
+                continue
+            if stack and stack[-1][0] == "{" and stack[-1][2]:
+                stack[-1][1] = json.loads(buffer[pos : end + 1])
+            state["pos"] = end + 1
+            continue
+
+        state["pos"] = pos + 1
+        if c == "{" or c == "[":
+            if c == "[" and tuple(entry[1] for entry in stack) == keys:
+                break
+            stack.append([c, None, c == "{"])
+        elif c == "}" or c == "]":
+            stack.pop()
+            if not stack:
+                return
+        elif c == ",":
+            stack[-1][2] = stack[-1][0] == "{"
+        elif c == ":":
+            stack[-1][2] = False
+
+    # decode the items of the array one at a time
+    while True:
+        buffer, pos = state["buffer"], state["pos"]
+        while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+            pos += 1
+        state["pos"] = pos
+        if pos >= len(buffer):
+            if state["exhausted"]:
+                return
+            read()
+            continue
+        if buffer[pos] == "]":
+            return
+
+        try:
+            item, end = scanner.raw_decode(buffer, pos)
+        except ValueError:
+            if state["exhausted"]:
+                raise
+            read()
+            continue
+        if end == len(buffer) or buffer[end] not in " \t\r\n,]":
+            # a number could go on in the next chunk, e.g. "1" or "1." followed by "5"
+            if not state["exhausted"]:
+                read()
+                continue
+            if end < len(buffer):
+                raise json.JSONDecodeError("Expecting ',' delimiter", buffer, end)
+        state["pos"] = end
+        yield item
+
+
+def _string_end(buffer, start):
+    # index of the quote closing the string opened at `start`, None if it's not in the buffer yet
+    i = start + 1
+    while True:
+        j = buffer.find('"', i)
+        if j == -1:
+            return None
+        k = j - 1
+        while buffer[k] == "\\":
+            k -= 1
+        if (j - 1 - k) % 2 == 0:
+            return j
+        i = j + 1
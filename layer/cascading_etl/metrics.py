@@ -0,0 +1,116 @@
+import json, os, threading, time
+from contextlib import contextmanager
+
+# CloudWatch namespace of the metrics, overridable per deployment
+NAMESPACE = os.environ.get("METRICS_NAMESPACE", "CascadingETL")
+
+_lock = threading.Lock()
+# name -> [calls, total milliseconds, max milliseconds]
+_timings = {}
+# name -> count
+_counts = {}
+
+
+@contextmanager
+def timer(name):
+    """
+    Time a block of code, e.g. a call to the API or to DynamoDB.
+
+    Args:
+        name (str): The name of the operation, e.g. "DynamoDBWrite".
+
+    Notes:
+        - The block is timed even if it raises.
+        - The timings are aggregated in memory until `flush`, so timing a call costs about a microsecond.
+
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, (time.perf_counter() - start) * 1000)
+
+
+def record(name, milliseconds):
+    """
+    Add a timing to the aggregates of an operation.
+
+    Args:
+        name (str): The name of the operation.
+        milliseconds (float): How long the operation took.
+
+    """
+    with _lock:
+        timing = _timings.get(name)
+        if timing is None:
+            _timings[name] = [1, milliseconds, milliseconds]
+        else:
+            timing[0] += 1
+            timing[1] += milliseconds
+            if milliseconds > timing[2]:
+                timing[2] = milliseconds
+
+
+def count(name, value=1):
+    """
+    Add to a counter, e.g. of the records written.
+
+    Args:
+        name (str): The name of the counter, e.g. "RecordsWritten".
+        value (int): The amount added to the counter (default: 1).
+
+    """
+    with _lock:
+        _counts[name] = _counts.get(name, 0) + value
+
+
+def flush(function_name):
+    """
+    Print the metrics collected since the last flush as a CloudWatch Embedded Metric Format document, and reset them.
+
+    Args:
+        function_name (str): The name of the Lambda function, the dimension of the metrics.
+
+    Returns:
+        dict: The document printed, None if nothing was collected.
+
+    Notes:
+        - Every timed operation yields `<name>Time`, its total duration, `<name>Calls` and `<name>MaxTime`.
+        - CloudWatch Logs turns the document into metrics, without any call to the CloudWatch API.
+
+    """
+    global _timings, _counts
+    with _lock:
+        timings, counts = _timings, _counts
+        _timings, _counts = {}, {}
+    if not timings and not counts:
+        return None
+
+    values = {}
+    units = {}
+    for name, (calls, total, maximum) in timings.items():
+        values[f"{name}Time"], units[f"{name}Time"] = round(total, 3), "Milliseconds"
+        values[f"{name}Calls"], units[f"{name}Calls"] = calls, "Count"
+        values[f"{name}MaxTime"], units[f"{name}MaxTime"] = round(maximum, 3), "Milliseconds"
+    for name, value in counts.items():
+        values[name], units[name] = value, "Count"
+
+    document = {
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [
+                {
+                    "Namespace": NAMESPACE,
+                    "Dimensions": [["FunctionName"]],
+                    "Metrics": [
+                        {"Name": name, "Unit": unit} for name, unit in units.items()
+                    ],
+                }
+            ],
+        },
+        "FunctionName": function_name,
+        **values,
+    }
+    # a line of its own on stdout, for CloudWatch Logs to extract the metrics from
+    print(json.dumps(document, separators=(",", ":")), flush=True)
+    return document
@@ -0,0 +1,289 @@
+import uuid, zlib
+from collections import deque
+from contextlib import ExitStack
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain, islice
+from cascading_etl import envelope, metrics
+from cascading_etl.utils import BatchWriter, MessageBatcher, diff_records, update_info
+
+# A stage is a callable taking an iterable of records and returning an iterable of records,
+# so that the collectors chain them lazily: source → keep → diff → sink → emit.
+
+
+def run(records, *stages):
+    """
+    Chain stages over records and drain them.
+
+    Args:
+        records (Iterable): The records entering the first stage, e.g. from `source`.
+        *stages (Callable): The stages, each taking the iterable returned by the previous one.
+
+    Returns:
+        int: The number of records coming out of the last stage.
+
+    """
+    count = 0
+    for _ in _chain(records, stages):
+        count += 1
+    return count
+
+
+def collect(records, *stages):
+    """
+    Chain stages over records and gather what comes out of the last one.
+
+    Args:
+        records (Iterable): The records entering the first stage.
+        *stages (Callable): The stages, each taking the iterable returned by the previous one.
+
+    Returns:
+        list: The records coming out of the last stage.
+
+    """
+    return list(_chain(records, stages))
+
+
+def _chain(records, stages):
+    for stage in stages:
+        records = stage(records)
+    return records
+
+
+def source(pages):
+    """
+    Flatten the pages of an API into a stream of records.
+
+    Args:
+        pages (Iterable[Iterable]): The pages, e.g. from `http_client.iter_pages`.
+
+    Returns:
+        Iterable: The records of every page, in order.
+
+    """
+    return chain.from_iterable(pages)
+
+
+def keep(predicate):
+    """
+    Build a stage dropping the records a predicate rejects.
+
+    Args:
+        predicate (Callable): Called with each record, truthy to keep it.
+
+    Returns:
+        Callable: The stage.
+
+    """
+
+    def stage(records):
+        return (record for record in records if predicate(record))
+
+    return stage
+
+
+def each(function):
+    """
+    Build a stage calling a function on every record and passing the record on.
+
+    Args:
+        function (Callable): Called with each record, its return value is ignored.
+
+    Returns:
+        Callable: The stage.
+
+    """
+
+    def stage(records):
+        for record in records:
+            function(record)
+            yield record
+
+    return stage
+
+
+def diff(table_name, prefix, batch_size=100, concurrency=1):
+    """
+    Build a stage dropping the records that are already up to date in a DynamoDB table.
+
+    Args:
+        table_name (str): The name of the DynamoDB table.
+        prefix (str): The prefix of the table, e.g. "sale_".
+        batch_size (int): The number of records checked by each call to `diff_records` (default: 100).
+        concurrency (int): The maximum number of batches checked at the same time (default: 1).
+
+    Returns:
+        Callable: The stage, keeping the order of the records.
+
+    Notes:
+        - With `concurrency` above 1, up to that many batches are read ahead in a thread pool.
+        - The records checked and the records dropped are counted as "RecordsProcessed" and "RecordsSkipped" in `metrics`.
+
+    """
+
+    def check(batch):
+        changed = diff_records(table_name, batch, prefix)
+        metrics.count("RecordsProcessed", len(batch))
+        metrics.count("RecordsSkipped", len(batch) - len(changed))
+        return changed
+
+    def stage(records):
+        batches = _batches(records, batch_size)
+        if concurrency <= 1:
+            for batch in batches:
+                yield from check(batch)
+            return
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            pending = deque()
+            for batch in batches:
+                pending.append(executor.submit(check, batch))
+                if len(pending) >= concurrency:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+
+    return stage
+
+
+def sink(table_name, prefix, flush_size=25):
+    """
+    Build a stage writing the records to a DynamoDB table with `BatchWriter`.
+
+    Args:
+        table_name (str): The name of the DynamoDB table.
+        prefix (str): The prefix of the table, e.g. "sale_".
+        flush_size (int): The number of records written per batch (default: 25).
+
+    Returns:
+        Callable: The stage, passing on the records once the batch holding them is written.
+
+    Notes:
+        - A batch is written as soon as it's full, the last one once the records run out,
+          so everything is persisted when the stage is drained.
+        - The records are counted as "RecordsWritten" in `metrics` once written, so a failed batch
+          is neither counted nor passed on.
+
+    """
+
+    def stage(records):
+        writer = BatchWriter(table_name, prefix, flush_size)
+        for batch in _batches(records, writer.flush_size):
+            for record in batch:
+                writer.put(record)
+            writer.flush()
+            metrics.count("RecordsWritten", len(batch))
+            yield from batch
+
+    return stage
+
+
+def upsert(table_name, prefix):
+    """
+    Build a stage writing the records that changed to a DynamoDB table, one conditional write each.
+
+    Args:
+        table_name (str): The name of the DynamoDB table.
+        prefix (str): The prefix of the table, e.g. "branch_".
+
+    Returns:
+        Callable: The stage, passing on the records written.
+
+    Notes:
+        - Each record is written with `update_info`, on the condition that its stored fingerprint differs, so there's
+          no read ahead of the write; it stands for `diff` and `sink` where records come a few at a time.
+        - The records written and the records left unchanged are counted as "RecordsWritten" and "RecordsSkipped"
+          in `metrics`, all of them as "RecordsProcessed".
+
+    """
+
+    def stage(records):
+        for record in records:
+            metrics.count("RecordsProcessed")
+            if update_info(table_name, record, prefix):
+                metrics.count("RecordsWritten")
+                yield record
+            else:
+                metrics.count("RecordsSkipped")
+
+    return stage
+
+
+def emit(queue_url, stage_name, trace_id=None, per_message=1, key=None):
+    """
+    Build a stage sending the records as workloads of the next stage with `MessageBatcher`.
+
+    Args:
+        queue_url (str or List[str]): The URL of the SQS queue of the next stage, or the URLs of its shards.
+        stage_name (str): The stage producing the messages, e.g. "salesperson".
+        trace_id (str): The ID shared by the messages, a new one if None (default: None).
+        per_message (int): The maximum number of workloads packed in a message (default: 1).
+        key (Callable): Called with each workload, the value it's routed by with `shard_of`; required with
+            several queues (default: None).
+
+    Returns:
+        Callable: The stage, passing on the message bodies as they're buffered.
+
+    Raises:
+        ValueError: If several queues are given without a `key`.
+
+    Notes:
+        - With several queues, a message only packs workloads of the same shard, so all the workloads
+          with the same key go to the same queue, and a slow one only holds up its own shard.
+
+    """
+    queue_urls = [queue_url] if isinstance(queue_url, str) else list(queue_url)
+    if len(queue_urls) > 1 and key is None:
+        raise ValueError("a key is required to route workloads to several queues")
+
+    def stage(workloads):
+        # one trace ID for all the messages, as if the workloads were packed at once
+        trace = trace_id or uuid.uuid4().hex
+        with ExitStack() as stack:
+            batchers = [stack.enter_context(MessageBatcher(url)) for url in queue_urls]
+            pending = [[] for _ in queue_urls]
+            for workload in workloads:
+                shard = shard_of(key(workload), len(queue_urls)) if key else 0
+                pending[shard].append(workload)
+                if len(pending[shard]) >= per_message:
+                    yield from _send(batchers[shard], pending[shard], stage_name, trace, per_message)
+                    pending[shard] = []
+            for shard, batch in enumerate(pending):
+                if batch:
+                    yield from _send(batchers[shard], batch, stage_name, trace, per_message)
+
+    return stage
+
+
+def shard_of(key, shards):
+    """
+    Pick the shard of a key, the same in every process.
+
+    Args:
+        key: The value to route by, e.g. an employee ID; compared as a string, so 7 and "7" go together.
+        shards (int): The number of shards.
+
+    Returns:
+        int: The shard, from 0 to `shards` - 1.
+
+    Notes:
+        - `hash` is salted per process for strings, so a CRC-32 of the key is used instead.
+
+    """
+    if shards <= 1:
+        return 0
+    return zlib.crc32(str(key).encode()) % shards
+
+
+def _send(batcher, workloads, stage_name, trace, per_message):
+    for message_body in envelope.pack(workloads, stage_name, trace, per_message):
+        batcher.put(message_body)
+        yield message_body
+
+
+def _batches(records, size):
+    records = iter(records)
+    while True:
+        batch = list(islice(records, size))
+        if not batch:
+            return
+        yield batch
@@ -0,0 +1,1636 @@
+import hashlib, json, logging, threading, time
+from collections import OrderedDict
+from datetime import datetime
+from decimal import Decimal
+from functools import lru_cache
+from cascading_etl import metrics
+
+LOGGER = logging.getLogger(__name__)
+
+# boto3 setup, deferred to the first call to `get_client`
+_session = None
+_clients = {}
+_clients_lock = threading.Lock()
+# (TypeSerializer, TypeDeserializer) of boto3, imported along with it
+_types = None
+
+# key schemas of the tables defined in templates/tables.yml, looked up by the
+# reserved-word prefix of the table: (hash key, range key)
+KEY_SCHEMAS = {
+    "branch_": ("branch_id", None),
+    "employee_": ("employee_id", "branch_id"),
+    "sale_": ("sale_id", "employee_id"),
+}
+
+# seconds a received message stays invisible to other consumers
+VISIBILITY_TIMEOUT = 120
+# maximum total size in bytes of the messages of a SendMessageBatch call
+MAX_BATCH_PAYLOAD = 262144
+
+# attributes left out of the fingerprint since they change on every write
+VOLATILE_ATTRIBUTES = ("last_modified", "fingerprint")
+
+
+class FingerprintCache:
+    """
+    Remember the fingerprints of the items read from or written to DynamoDB, across invocations of a warm container.
+
+    Args:
+        maxsize (int): The maximum number of fingerprints kept, the least recently used are evicted first (default: 10000).
+        ttl (float): The number of seconds a fingerprint is trusted for (default: 900).
+
+    Notes:
+        - Entries are keyed by the table name and the values of the item key.
+        - 10000 entries take a few MB, which leaves room in the 128 MB functions.
+        - The cache is bypassed while `enabled` is False.
+        - `hits` and `misses` count lookups since the container started.
+
+    """
+
+    def __init__(self, maxsize=10000, ttl=900):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.enabled = True
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, table_name, key_values):
+        """
+        Look up the fingerprint of an item.
+
+        Args:
+            table_name (str): The name of the DynamoDB table.
+            key_values (tuple): The values of the item key.
+
+        Returns:
+            str: The cached fingerprint, or None if it's unknown or expired.
+
+        """
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._entries.get((table_name, key_values))
+            if entry is None or entry[1] < time.monotonic():
+                self._entries.pop((table_name, key_values), None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end((table_name, key_values))
+            self.hits += 1
+            return entry[0]
+
+    def put(self, table_name, key_values, digest):
+        """
+        Remember the fingerprint of an item.
+
+        Args:
+            table_name (str): The name of the DynamoDB table.
+            key_values (tuple): The values of the item key.
+            digest (str): The fingerprint stored with the item.
+
+        Returns:
+            None
+
+        """
+        if not self.enabled or digest is None:
+            return
+
+        with self._lock:
+            self._entries[(table_name, key_values)] = (digest, time.monotonic() + self.ttl)
+            self._entries.move_to_end((table_name, key_values))
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        """
+        Summarize the cache for the logs.
+
+        Returns:
+            dict: The hit and miss counters and the number of cached fingerprints.
+
+        """
+        return {
+            "fingerprint_cache_hits": self.hits,
+            "fingerprint_cache_misses": self.misses,
+            "fingerprint_cache_size": len(self._entries),
+        }
+
+
+fingerprint_cache = FingerprintCache()
+
+
+def get_client(service_name):
+    """
+    Get the low-level boto3 client of an AWS service shared by every call in this container.
+
+    Args:
+        service_name (str): The name of the service, e.g. "dynamodb" or "sqs".
+
+    Returns:
+        botocore.client.BaseClient: The client, created on first use.
+
+    Notes:
+        - boto3 is only imported, and a client only built, once an invocation needs it, which keeps cold starts short.
+        - DynamoDB is used through its client rather than a resource, items being converted with `serialize` and `deserialize`.
+
+    """
+    global _session, _types
+    client = _clients.get(service_name)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(service_name)
+            if client is None:
+                import boto3
+                from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+
+                if _session is None:
+                    _session = boto3.session.Session()
+                    _types = (TypeSerializer(), TypeDeserializer())
+                client = _clients[service_name] = _session.client(service_name)
+    return client
+
+
+def serialize(item):
+    """
+    Convert the values of an item to the DynamoDB attribute values expected by the low-level client.
+
+    Args:
+        item (dict): The item, with Python values, e.g. {"sale_id": "1", "quantity": 3}.
+
+    Returns:
+        dict: The item, with DynamoDB values, e.g. {"sale_id": {"S": "1"}, "quantity": {"N": "3"}}.
+
+    """
+    if _types is None:
+        get_client("dynamodb")
+    serializer = _types[0]
+    return {k: serializer.serialize(v) for k, v in item.items()}
+
+
+def deserialize(item):
+    """
+    Convert the DynamoDB attribute values returned by the low-level client to Python values.
+
+    Args:
+        item (dict): The item, with DynamoDB values.
+
+    Returns:
+        dict: The item, with Python values, numbers being Decimals.
+
+    """
+    if _types is None:
+        get_client("dynamodb")
+    deserializer = _types[1]
+    return {k: deserializer.deserialize(v) for k, v in item.items()}
+
+
+def update_table(table_name, key, record, if_changed=False):
+    """
+    Update the specified DynamoDB table with the provided record.
+
+    Args:
+        table_name (str): The name of the DynamoDB table to update.
+        key (dict): The key identifying the record to update.
+        record (dict): The updated values to set for the record.
+        if_changed (bool): Only update the item when its fingerprint differs from the record's (default: False).
+
+    Returns:
+        bool: True if the item is updated, False if it's skipped because it's unchanged.
+
+    Raises:
+        botocore.exceptions.ClientError: If the update operation fails, so that callers can retry it.
+
+    Notes:
+        - The update expression and expression attribute names are compiled by `update_expression` and cached,
+          so only the expression attribute values are built for each record.
+        - Attribute names are passed as placeholders, so reserved words don't need to be renamed; tables created from now on
+          can be written with an empty prefix.
+        - It uses the provided table name and key to access the DynamoDB table.
+        - The function logs the successful completion of the update operation, including the affected table and key.
+        - With `if_changed`, the update is conditional on the stored fingerprint, so an unchanged item costs no read
+          and a single failed conditional write.
+
+    """
+    names = tuple(sorted(record))
+    expression, attribute_names, condition = update_expression(
+        names, if_changed and "fingerprint" in record
+    )
+    update_values = {f":v{i}": record[name] for i, name in enumerate(names)}
+
+    dynamodb = get_client("dynamodb")
+    try:
+        with metrics.timer("DynamoDBWrite"):
+            r = dynamodb.update_item(
+                TableName=table_name,
+                Key=serialize(key),
+                UpdateExpression=expression,
+                ExpressionAttributeNames=attribute_names,
+                ExpressionAttributeValues=serialize(update_values),
+                **condition,
+            )
+    except dynamodb.exceptions.ConditionalCheckFailedException:
+        LOGGER.info(
+            f"item {list(key.values())[0]} of table {table_name} is unchanged, skipping"
+        )
+        return False
+
+    info = f"""successfully completed the update operation of item: {list(key.values())[0]} to table {table_name}"""
+    LOGGER.info(info, extra=r)
+    return True
+
+
+@lru_cache(maxsize=256)
+def update_expression(names, if_changed=False):
+    """
+    Compile the update expression that sets the given attributes.
+
+    Args:
+        names (tuple): The sorted names of the attributes to set.
+        if_changed (bool): Whether to add the condition on the `fingerprint` attribute (default: False).
+
+    Returns:
+        tuple: The update expression, the expression attribute names, and the condition as keyword arguments.
+
+    Notes:
+        - The value of the attribute `names[i]` is expected as ":v{i}" in the expression attribute values.
+        - The results are cached and shared, so they must not be modified.
+
+    """
+    expression = "set " + ", ".join(f"#a{i} = :v{i}" for i in range(len(names)))
+    attribute_names = {f"#a{i}": name for i, name in enumerate(names)}
+
+    condition = dict()
+    if if_changed:
+        i = names.index("fingerprint")
+        condition["ConditionExpression"] = f"attribute_not_exists(#a{i}) OR #a{i} <> :v{i}"
+    return expression, attribute_names, condition
+
+
+def upToDate(table_name, condition, result, prefix):
+    """
+    Check if a record in a given specified DynamoDB table is up-to-date, which means that it's no different from the API retrieval.
+
+    Args:
+        table_name (str): The name of the DynamoDB table to check.
+        condition (boto3.dynamodb.conditions.Key): The key condition expression for querying the table.
+        result (dict): The record to check for ingestion completion.
+        prefix (str): The prefix used for key matching.
+
+    Returns:
+        bool: True if the ingestion is completed, False otherwise.
+
+    Notes:
+        - The function queries the specified DynamoDB table using the provided condition.
+        - It retrieves the items matching the condition.
+        - The function compares the key-value pairs of the result with the retrieved items, accounting for the provided prefix if applicable.
+        - If all key-value pairs match between the result and the retrieved items, the ingestion is considered completed.
+        - The function returns True if the ingestion is completed, and False otherwise.
+
+    """
+    # condition objects need the resource, only built for this legacy check
+    get_client("dynamodb")
+    table = _session.resource("dynamodb").Table(table_name)
+    retrieval = table.query(KeyConditionExpression=condition)["Items"]
+
+    existing_items = 0
+    if len(retrieval) > 0:
+        for key in retrieval.keys():
+            if key.upper() not in reserved_words:
+                if result[key] == retrieval[0].get(key):
+                    existing_items += 1
+            elif result["key"] == retrieval[0].get(prefix + key):
+                existing_items += 1
+
+    completed = len(retrieval) and existing_items == len(result.items())
+    # len(retrieval) == 0: the item doesn't exist in DynamoDB at all
+    # existing_items == len(result.items()): the item exists and all its key-value pairs
+    # are synced up with API
+    return completed
+
+
+def diff_records(table_name, records, prefix, max_retries=8, backoff=0.05):
+    """
+    Find the API records that are missing from or different in the specified DynamoDB table.
+
+    Args:
+        table_name (str): The name of the DynamoDB table to check.
+        records (Iterable[dict]): A page of records retrieved from the API.
+        prefix (str): The prefix of the table, used for reserved words and the key schema.
+        max_retries (int): The number of times unprocessed keys are retried (default: 8).
+        backoff (float): The initial delay in seconds between retries, doubled on every attempt (default: 0.05).
+
+    Returns:
+        List[dict]: The records that need to be written, in their original order.
+
+    Raises:
+        RuntimeError: If some keys are still unprocessed after `max_retries` retries.
+
+    Notes:
+        - The existing items are fetched with `batch_get_item` in chunks of 100 keys, the API maximum.
+        - Only the key and the `fingerprint` of the items are projected.
+        - A record is unchanged when its item exists with the same fingerprint, reserved words being prefixed.
+        - Items without a fingerprint are reported as changed, see `backfill_fingerprints`.
+        - Records whose fingerprint matches `fingerprint_cache` aren't fetched at all.
+
+    """
+    expected = {}
+    for record in records:
+        key, attributes = item_attributes(record, prefix)
+        expected[tuple(key.values())] = (record, key, attributes["fingerprint"])
+
+    cached = {
+        key_values
+        for key_values, (_, _, digest) in expected.items()
+        if fingerprint_cache.get(table_name, key_values) == digest
+    }
+
+    key_names = [k for k in KEY_SCHEMAS[prefix] if k]
+    existing = {}
+    pending = [v for k, v in expected.items() if k not in cached]
+    for start in range(0, len(pending), 100):
+        chunk = pending[start : start + 100]
+        names = {f"#a{i}": name for i, name in enumerate(key_names + ["fingerprint"])}
+        request = {
+            table_name: {
+                "Keys": [serialize(key) for _, key, _ in chunk],
+                "ProjectionExpression": ", ".join(names),
+                "ExpressionAttributeNames": names,
+            }
+        }
+        for attempt in range(max_retries + 1):
+            if attempt:
+                time.sleep(backoff * 2 ** (attempt - 1))
+            with metrics.timer("DynamoDBRead"):
+                r = get_client("dynamodb").batch_get_item(RequestItems=request)
+            for item in r["Responses"].get(table_name, []):
+                item = deserialize(item)
+                key_values = tuple(item[k] for k in key_names)
+                existing[key_values] = item
+                fingerprint_cache.put(table_name, key_values, item.get("fingerprint"))
+            request = r.get("UnprocessedKeys")
+            if not request:
+                break
+        else:
+            raise RuntimeError(
+                f"{len(request[table_name]['Keys'])} keys are still unprocessed by table {table_name}"
+            )
+
+    changed = []
+    for key_values, (record, key, digest) in expected.items():
+        if key_values in cached:
+            continue
+        item = existing.get(key_values)
+        if item is None or item.get("fingerprint") != digest:
+            changed.append(record)
+
+    LOGGER.info(
+        f"{len(changed)} out of {len(expected)} records are outdated in table {table_name}"
+    )
+    return changed
+
+
+def update_info(table_name, record, prefix, if_changed=True):
+    """
+    Update the specified DynamoDB table with the given record.
+
+    Args:
+        table_name (str): The name of the DynamoDB table to update.
+        record (dict): The record to update in the table.
+        prefix (str): The prefix of the table, used for reserved words and the key schema.
+        if_changed (bool): Skip the write when the stored fingerprint matches the record's (default: True).
+
+    Returns:
+        bool: True if the item is updated, False if it's skipped because it's unchanged.
+
+    Raises:
+        botocore.exceptions.ClientError: If the update operation fails.
+
+    Notes:
+        - The key and the attributes are built by `item_attributes`, like `diff_records` and `BatchWriter` do,
+          so the three of them agree on the fingerprint of a record.
+        - With `if_changed`, the write is conditional on the stored fingerprint, so an unchanged record costs
+          a single failed conditional write instead of a read and a write, and none at all if its fingerprint
+          is in `fingerprint_cache`.
+
+    """
+    key, attributes = item_attributes(record, prefix)
+    key_values = tuple(key.values())
+    if if_changed and fingerprint_cache.get(table_name, key_values) == attributes["fingerprint"]:
+        return False
+
+    updated = update_table(table_name, key, attributes, if_changed)
+    fingerprint_cache.put(table_name, key_values, attributes["fingerprint"])
+    return updated
+
+
+def item_attributes(record, prefix):
+    """
+    Build the key and the attributes under which an API record is stored.
+
+    Args:
+        record (dict): The record retrieved from the API.
+        prefix (str): The prefix of the table the record belongs to, e.g. "sale_".
+
+    Returns:
+        Tuple[dict, dict]: The key of the item, see `item_key`, and its other attributes, see `to_attributes`.
+
+    Notes:
+        - The `id` of the record and the key attributes are left out of the attributes, and so of the fingerprint.
+
+    """
+    key = item_key(record, prefix)
+    return key, to_attributes(record, prefix, ("id",) + tuple(key))
+
+
+def to_attributes(record, prefix, excluded=()):
+    """
+    Convert an API record into the attributes stored in DynamoDB.
+
+    Args:
+        record (dict): The record retrieved from the API.
+        prefix (str): The prefix used for key matching.
+        excluded (Iterable[str]): The record keys that are not stored as plain attributes, e.g. the primary key.
+
+    Returns:
+        dict: The attributes to store.
+
+    Notes:
+        - Keys that are DynamoDB reserved words are renamed with the specified prefix.
+        - The `fingerprint` field is added with the hash of the other attributes.
+        - The `last_modified` field is added with the current UTC timestamp.
+
+    """
+    attributes = {}
+    for k, v in record.items():
+        if k not in excluded:
+            attributes[attribute_name(prefix, k)] = v
+
+    attributes["fingerprint"] = fingerprint(attributes)
+    attributes["last_modified"] = str(datetime.utcnow())
+    return attributes
+
+
+@lru_cache(maxsize=1024)
+def attribute_name(prefix, name):
+    """
+    Get the name under which an attribute of an API record is stored.
+
+    Args:
+        prefix (str): The prefix of the table, e.g. "sale_", or "" to keep the names of the API.
+        name (str): The name of the attribute in the API record.
+
+    Returns:
+        str: The name prefixed if it's a DynamoDB reserved word, the name itself otherwise.
+
+    Notes:
+        - The names are memoized, since the same few attribute names come up for every record.
+
+    """
+    if name.upper() in reserved_words:
+        return prefix + name
+    return name
+
+
+def _canonical(value):
+    # numbers read back from DynamoDB are Decimals while the API gives ints and floats
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    return str(value)
+
+
+def fingerprint(attributes):
+    """
+    Hash the attributes of an item so that changes can be detected without comparing them one by one.
+
+    Args:
+        attributes (dict): The attributes of the item, as stored in DynamoDB.
+
+    Returns:
+        str: The hex digest of the canonical JSON of the attributes.
+
+    Notes:
+        - The attributes in `VOLATILE_ATTRIBUTES` are left out.
+        - Numbers hash the same whether they come from the API or back from DynamoDB.
+
+    """
+    canonical = json.dumps(
+        {k: v for k, v in attributes.items() if k not in VOLATILE_ATTRIBUTES},
+        sort_keys=True,
+        separators=(",", ":"),
+        default=_canonical,
+    )
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+
+def backfill_fingerprints(table_name, prefix):
+    """
+    Add the `fingerprint` attribute to the items of a table written before it existed.
+
+    Args:
+        table_name (str): The name of the DynamoDB table to backfill, e.g. "sale-dev".
+        prefix (str): The prefix of the table, used for the key schema.
+
+    Returns:
+        int: The number of items backfilled.
+
+    Notes:
+        - The table is scanned page by page for items without a `fingerprint`.
+        - The fingerprint is computed from the stored attributes other than the key, exactly as for an API record.
+        - `last_modified` is left untouched since the content of the items doesn't change.
+
+    """
+    key_names = [k for k in KEY_SCHEMAS[prefix] if k]
+    dynamodb = get_client("dynamodb")
+    scan = {
+        "TableName": table_name,
+        "FilterExpression": "attribute_not_exists(fingerprint)",
+    }
+
+    backfilled = 0
+    while True:
+        r = dynamodb.scan(**scan)
+        for item in r["Items"]:
+            item = deserialize(item)
+            key = {k: item.pop(k) for k in key_names}
+            dynamodb.update_item(
+                TableName=table_name,
+                Key=serialize(key),
+                UpdateExpression="set fingerprint = :fingerprint",
+                ConditionExpression="attribute_not_exists(fingerprint)",
+                ExpressionAttributeValues=serialize(
+                    {":fingerprint": fingerprint(item)}
+                ),
+            )
+            backfilled += 1
+        if "LastEvaluatedKey" not in r:
+            break
+        scan["ExclusiveStartKey"] = r["LastEvaluatedKey"]
+
+    LOGGER.info(f"backfilled the fingerprint of {backfilled} items of table {table_name}")
+    return backfilled
+
+
+def item_key(record, prefix):
+    """
+    Build the DynamoDB key of an API record.
+
+    Args:
+        record (dict): The record retrieved from the API.
+        prefix (str): The prefix of the table the record belongs to, e.g. "sale_".
+
+    Returns:
+        dict: The key of the item, following the key schema in `KEY_SCHEMAS`.
+
+    Notes:
+        - The hash key holds the `id` of the record, e.g. `sale_id` for a sale.
+        - The range key, if any, is read from the record under the same name, e.g. `employee_id` for a sale.
+
+    """
+    hash_key, range_key = KEY_SCHEMAS[prefix]
+    key = {hash_key: str(record["id"])}
+    if range_key:
+        key[range_key] = str(record[range_key])
+    return key
+
+
+class BatchWriter:
+    """
+    Buffer records and write them to a DynamoDB table with `batch_write_item`.
+
+    Args:
+        table_name (str): The name of the DynamoDB table to write to.
+        prefix (str): The prefix of the table, used for reserved words and the key schema.
+        flush_size (int): The number of buffered items that triggers a flush (default: 25, the API maximum).
+        max_retries (int): The number of times unprocessed items are retried (default: 8).
+        backoff (float): The initial delay in seconds between retries, doubled on every attempt (default: 0.05).
+
+    Notes:
+        - Items are stored the way `update_info` stores them, with `item_attributes`: reserved words are prefixed and `last_modified` is stamped.
+        - Items are written with `PutRequest`, so an item is replaced as a whole rather than merged attribute by attribute.
+        - Records with the same key within one batch are deduplicated, the last one wins.
+        - Used as a context manager, the remaining items are flushed on exit unless an exception was raised.
+        - The fingerprints of the written items are remembered in `fingerprint_cache`.
+
+    """
+
+    def __init__(self, table_name, prefix, flush_size=25, max_retries=8, backoff=0.05):
+        self.table_name = table_name
+        self.prefix = prefix
+        self.flush_size = min(flush_size, 25)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.written = 0
+        self._buffer = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.flush()
+
+    def put(self, record):
+        """
+        Add an API record to the buffer, flushing it once it's full.
+
+        Args:
+            record (dict): The record retrieved from the API.
+
+        Returns:
+            None
+
+        """
+        key, item = item_attributes(record, self.prefix)
+        item.update(key)
+        self._buffer[tuple(key.values())] = item
+        if len(self._buffer) >= self.flush_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Write the buffered items, retrying unprocessed items with exponential backoff.
+
+        Returns:
+            None
+
+        Raises:
+            RuntimeError: If some items are still unprocessed after `max_retries` retries.
+
+        """
+        if not self._buffer:
+            return
+
+        buffered = self._buffer
+        pending = [
+            {"PutRequest": {"Item": serialize(item)}} for item in buffered.values()
+        ]
+        self._buffer = {}
+        count = len(pending)
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+            with metrics.timer("DynamoDBWrite"):
+                r = get_client("dynamodb").batch_write_item(
+                    RequestItems={self.table_name: pending}
+                )
+            pending = r.get("UnprocessedItems", {}).get(self.table_name, [])
+            if not pending:
+                break
+        else:
+            raise RuntimeError(
+                f"{len(pending)} items are still unprocessed by table {self.table_name}"
+            )
+
+        for key_values, item in buffered.items():
+            fingerprint_cache.put(self.table_name, key_values, item["fingerprint"])
+        self.written += count
+        LOGGER.info(f"successfully wrote {count} items to table {self.table_name}")
+
+
+def read_checkpoint(table_name, employee_id):
+    """
+    Get the timestamp of the latest sale ingested for a salesperson.
+
+    Args:
+        table_name (str): The name of the DynamoDB table of checkpoints.
+        employee_id (str): The ID of the salesperson.
+
+    Returns:
+        str: The `transaction_timestamp` of the latest sale, or None if none is ingested yet.
+
+    """
+    with metrics.timer("DynamoDBRead"):
+        item = (
+            get_client("dynamodb")
+            .get_item(
+                TableName=table_name,
+                Key=serialize({"employee_id": employee_id}),
+                ProjectionExpression="transaction_timestamp",
+            )
+            .get("Item")
+        )
+    return deserialize(item)["transaction_timestamp"] if item else None
+
+
+def advance_checkpoint(table_name, employee_id, timestamp):
+    """
+    Move the checkpoint of a salesperson forward to the timestamp of its latest ingested sale.
+
+    Args:
+        table_name (str): The name of the DynamoDB table of checkpoints.
+        employee_id (str): The ID of the salesperson.
+        timestamp (str): The `transaction_timestamp` of the latest sale ingested.
+
+    Returns:
+        None
+
+    Notes:
+        - The checkpoint never moves backwards, even if concurrent invocations of the same salesperson finish out of order.
+
+    """
+    dynamodb = get_client("dynamodb")
+    try:
+        with metrics.timer("DynamoDBWrite"):
+            dynamodb.update_item(
+                TableName=table_name,
+                Key=serialize({"employee_id": employee_id}),
+                UpdateExpression="set transaction_timestamp = :ts",
+                ConditionExpression="attribute_not_exists(transaction_timestamp) OR transaction_timestamp < :ts",
+                ExpressionAttributeValues=serialize({":ts": timestamp}),
+            )
+    except dynamodb.exceptions.ConditionalCheckFailedException:
+        LOGGER.info(f"checkpoint of salesperson {employee_id} is already past {timestamp}")
+
+
+def event_messages(event):
+    """
+    Convert the records of an SQS event into messages shaped like the ones returned by `receive_message`.
+
+    Args:
+        event (dict): The event of an SQS event source mapping.
+
+    Returns:
+        List[dict]: The messages, with their 'MessageId', 'ReceiptHandle' and 'Body'.
+
+    """
+    return [
+        {
+            "MessageId": record["messageId"],
+            "ReceiptHandle": record["receiptHandle"],
+            "Body": record["body"],
+        }
+        for record in event.get("Records", [])
+    ]
+
+
+def batch_item_failures(messages):
+    """
+    Build the response that reports the messages of an SQS event that failed.
+
+    Args:
+        messages (List[dict]): The failed messages, as returned by `event_messages`.
+
+    Returns:
+        dict: The partial batch response, so that only the failed messages are retried.
+
+    """
+    return {
+        "batchItemFailures": [
+            {"itemIdentifier": message["MessageId"]} for message in messages
+        ]
+    }
+
+
+def deliver_message(queue_url, message):
+    """
+    Deliver a message to the specified queue URL.
+
+    Args:
+        queue_url (str): The URL of the queue to deliver the message to.
+        message (Any): The message to be delivered.
+
+    Returns:
+        None
+
+    Notes:
+        - The function uses the SQS client of `get_client` to send a message to the specified `queue_url`.
+        - The message body is converted to a string before delivery.
+
+    """
+    with metrics.timer("SQSSend"):
+        get_client("sqs").send_message(
+            QueueUrl=queue_url,
+            MessageBody=(str(message)),
+        )
+
+
+def delete_message(url, ReceiptHandle):
+    """
+    Delete a message from the specified queue.
+
+    Args:
+        url (str): The URL of the queue.
+        ReceiptHandle (str): The receipt handle of the message to delete.
+
+    Returns:
+        None
+
+    Notes:
+        - The function uses the SQS client of `get_client` to delete a message from the specified `url` using the provided `ReceiptHandle`.
+
+    """
+    with metrics.timer("SQSDelete"):
+        get_client("sqs").delete_message(QueueUrl=url, ReceiptHandle=ReceiptHandle)
+
+
+class MessageBatcher:
+    """
+    Buffer messages and deliver them to a queue with `send_message_batch`.
+
+    Args:
+        queue_url (str): The URL of the queue to deliver the messages to.
+        max_retries (int): The number of times failed entries are retried (default: 8).
+        backoff (float): The initial delay in seconds between retries, doubled on every attempt (default: 0.05).
+
+    Notes:
+        - A batch is sent once it holds 10 messages, or once the next message would exceed the 256 KB payload limit.
+        - Message bodies are converted to strings, the same way as `deliver_message` does.
+        - Used as a context manager, the remaining messages are sent on exit unless an exception was raised.
+
+    """
+
+    def __init__(self, queue_url, max_retries=8, backoff=0.05):
+        self.queue_url = queue_url
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.delivered = 0
+        self._entries = []
+        self._size = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.flush()
+
+    def put(self, message):
+        """
+        Add a message to the buffer, sending the batch when it's full.
+
+        Args:
+            message (Any): The message to be delivered.
+
+        Returns:
+            None
+
+        """
+        body = str(message)
+        size = len(body.encode("utf-8"))
+        if self._size + size > MAX_BATCH_PAYLOAD:
+            self.flush()
+        self._entries.append({"Id": str(len(self._entries)), "MessageBody": body})
+        self._size += size
+        if len(self._entries) == 10:
+            self.flush()
+
+    def flush(self):
+        """
+        Send the buffered messages.
+
+        Returns:
+            None
+
+        Raises:
+            RuntimeError: If some messages still failed after `max_retries` retries.
+
+        """
+        if not self._entries:
+            return
+
+        entries, self._entries, self._size = self._entries, [], 0
+        with metrics.timer("SQSSend"):
+            _batch_call(
+                get_client("sqs").send_message_batch,
+                self.queue_url,
+                entries,
+                self.max_retries,
+                self.backoff,
+            )
+        self.delivered += len(entries)
+
+
+def delete_messages(url, messages, max_retries=8, backoff=0.05):
+    """
+    Delete messages from the specified queue with `delete_message_batch`.
+
+    Args:
+        url (str): The URL of the queue.
+        messages (List[dict]): The messages to delete, as returned by `receive_message`.
+        max_retries (int): The number of times failed entries are retried (default: 8).
+        backoff (float): The initial delay in seconds between retries, doubled on every attempt (default: 0.05).
+
+    Returns:
+        None
+
+    Raises:
+        RuntimeError: If some messages still failed after `max_retries` retries.
+
+    """
+    for start in range(0, len(messages), 10):
+        entries = [
+            {"Id": str(i), "ReceiptHandle": message["ReceiptHandle"]}
+            for i, message in enumerate(messages[start : start + 10])
+        ]
+        with metrics.timer("SQSDelete"):
+            _batch_call(
+                get_client("sqs").delete_message_batch,
+                url,
+                entries,
+                max_retries,
+                backoff,
+            )
+
+
+def _batch_call(operation, url, entries, max_retries, backoff):
+    # retry the entries reported as failed, unless the failure is on our side
+    for attempt in range(max_retries + 1):
+        if attempt:
+            time.sleep(backoff * 2 ** (attempt - 1))
+        r = operation(QueueUrl=url, Entries=entries)
+        failed = r.get("Failed", [])
+        if not failed:
+            return
+        if any(f["SenderFault"] for f in failed):
+            raise RuntimeError(f"{len(failed)} entries are rejected by queue {url}: {failed}")
+        failed_ids = {f["Id"] for f in failed}
+        entries = [entry for entry in entries if entry["Id"] in failed_ids]
+
+    raise RuntimeError(f"{len(entries)} entries still failed for queue {url}")
+
+
+def receive_message(url, maxNumberOfMessages=10, waitTimeSeconds=0):
+    """
+    Receive messages from the specified queue URL.
+
+    Args:
+        url (str): The URL of the queue to receive messages from.
+        maxNumberOfMessages (int): The maximum number of messages to receive (default: 10).
+        waitTimeSeconds (int): The number of seconds to long-poll for messages, 0 to return immediately (default: 0).
+
+    Returns:
+        List[dict]: A list of received messages.
+
+    Notes:
+        - The function uses the SQS client of `get_client` to receive messages from the specified `url` with the provided `maxNumberOfMessages`.
+        - The received messages are extracted from the response and returned as a list.
+
+    """
+    with metrics.timer("SQSReceive"):
+        response = get_client("sqs").receive_message(
+            QueueUrl=url,
+            MaxNumberOfMessages=maxNumberOfMessages,
+            VisibilityTimeout=VISIBILITY_TIMEOUT,
+            WaitTimeSeconds=waitTimeSeconds,
+        )
+    result = response.get("Messages", [])
+    return result
+
+
+def drain_messages(url, context, safety_margin=120000, waitTimeSeconds=20):
+    """
+    Receive batches of messages until the queue is empty or the invocation runs out of time.
+
+    Args:
+        url (str): The URL of the queue to receive messages from.
+        context: The context object provided by the Lambda runtime.
+        safety_margin (int): The number of milliseconds left to the invocation under which no batch is received (default: 120000).
+        waitTimeSeconds (int): The number of seconds to long-poll for each batch (default: 20).
+
+    Yields:
+        List[dict]: Batches of up to 10 messages.
+
+    Notes:
+        - The safety margin should leave enough time to process a whole batch.
+        - The visibility of a batch is extended by `VisibilityHeartbeat` until the next batch is requested.
+
+    """
+    while context.get_remaining_time_in_millis() > safety_margin:
+        messages = receive_message(url, waitTimeSeconds=waitTimeSeconds)
+        if not messages:
+            LOGGER.info(f"queue {url} is drained")
+            return
+        with VisibilityHeartbeat(url, messages):
+            yield messages
+
+    LOGGER.info(f"stopped draining queue {url} to stay within the time limit")
+
+
+class VisibilityHeartbeat:
+    """
+    Keep messages invisible to other consumers while they are being processed.
+
+    Args:
+        url (str): The URL of the queue the messages were received from.
+        messages (List[dict]): The messages being processed.
+        visibility_timeout (int): The visibility timeout in seconds to extend the messages by (default: `VISIBILITY_TIMEOUT`).
+
+    Notes:
+        - Used as a context manager, a background thread extends the visibility every half timeout until exit.
+        - Messages deleted in the meantime are simply reported as failed by SQS and ignored.
+
+    """
+
+    def __init__(self, url, messages, visibility_timeout=None):
+        self.url = url
+        self.messages = messages
+        self.visibility_timeout = visibility_timeout or VISIBILITY_TIMEOUT
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stopped.wait(self.visibility_timeout / 2):
+            try:
+                get_client("sqs").change_message_visibility_batch(
+                    QueueUrl=self.url,
+                    Entries=[
+                        {
+                            "Id": str(i),
+                            "ReceiptHandle": message["ReceiptHandle"],
+                            "VisibilityTimeout": self.visibility_timeout,
+                        }
+                        for i, message in enumerate(self.messages)
+                    ],
+                )
+            except Exception as e:
+                LOGGER.info(e)
+
+
+# DynamoDB reserved words, see https://docs.aws.amazon.com/amazondynamodb/latest/developerguide/ReservedWords.html
+reserved_words = frozenset(
+    {
+        "ABORT",
+        "ABSOLUTE",
+        "ACTION",
+        "ADD",
+        "AFTER",
+        "AGENT",
+        "AGGREGATE",
+        "ALL",
+        "ALLOCATE",
+        "ALTER",
+        "ANALYZE",
+        "AND",
+        "ANY",
+        "ARCHIVE",
+        "ARE",
+        "ARRAY",
+        "AS",
+        "ASC",
+        "ASCII",
+        "ASENSITIVE",
+        "ASSERTION",
+        "ASYMMETRIC",
+        "AT",
+        "ATOMIC",
+        "ATTACH",
+        "ATTRIBUTE",
+        "AUTH",
+        "AUTHORIZATION",
+        "AUTHORIZE",
+        "AUTO",
+        "AVG",
+        "BACK",
+        "BACKUP",
+        "BASE",
+        "BATCH",
+        "BEFORE",
+        "BEGIN",
+        "BETWEEN",
+        "BIGINT",
+        "BINARY",
+        "BIT",
+        "BLOB",
+        "BLOCK",
+        "BOOLEAN",
+        "BOTH",
+        "BREADTH",
+        "BUCKET",
+        "BULK",
+        "BY",
+        "BYTE",
+        "CALL",
+        "CALLED",
+        "CALLING",
+        "CAPACITY",
+        "CASCADE",
+        "CASCADED",
+        "CASE",
+        "CAST",
+        "CATALOG",
+        "CHAR",
+        "CHARACTER",
+        "CHECK",
+        "CLASS",
+        "CLOB",
+        "CLOSE",
+        "CLUSTER",
+        "CLUSTERED",
+        "CLUSTERING",
+        "CLUSTERS",
+        "COALESCE",
+        "COLLATE",
+        "COLLATION",
+        "COLLECTION",
+        "COLUMN",
+        "COLUMNS",
+        "COMBINE",
+        "COMMENT",
+        "COMMIT",
+        "COMPACT",
+        "COMPILE",
+        "COMPRESS",
+        "CONDITION",
+        "CONFLICT",
+        "CONNECT",
+        "CONNECTION",
+        "CONSISTENCY",
+        "CONSISTENT",
+        "CONSTRAINT",
+        "CONSTRAINTS",
+        "CONSTRUCTOR",
+        "CONSUMED",
+        "CONTINUE",
+        "CONVERT",
+        "COPY",
+        "CORRESPONDING",
+        "COUNT",
+        "COUNTER",
+        "CREATE",
+        "CROSS",
+        "CUBE",
+        "CURRENT",
+        "CURSOR",
+        "CYCLE",
+        "DATA",
+        "DATABASE",
+        "DATE",
+        "DATETIME",
+        "DAY",
+        "DEALLOCATE",
+        "DEC",
+        "DECIMAL",
+        "DECLARE",
+        "DEFAULT",
+        "DEFERRABLE",
+        "DEFERRED",
+        "DEFINE",
+        "DEFINED",
+        "DEFINITION",
+        "DELETE",
+        "DELIMITED",
+        "DEPTH",
+        "DEREF",
+        "DESC",
+        "DESCRIBE",
+        "DESCRIPTOR",
+        "DETACH",
+        "DETERMINISTIC",
+        "DIAGNOSTICS",
+        "DIRECTORIES",
+        "DISABLE",
+        "DISCONNECT",
+        "DISTINCT",
+        "DISTRIBUTE",
+        "DO",
+        "DOMAIN",
+        "DOUBLE",
+        "DROP",
+        "DUMP",
+        "DURATION",
+        "DYNAMIC",
+        "EACH",
+        "ELEMENT",
+        "ELSE",
+        "ELSEIF",
+        "EMPTY",
+        "ENABLE",
+        "END",
+        "EQUAL",
+        "EQUALS",
+        "ERROR",
+        "ESCAPE",
+        "ESCAPED",
+        "EVAL",
+        "EVALUATE",
+        "EXCEEDED",
+        "EXCEPT",
+        "EXCEPTION",
+        "EXCEPTIONS",
+        "EXCLUSIVE",
+        "EXEC",
+        "EXECUTE",
+        "EXISTS",
+        "EXIT",
+        "EXPLAIN",
+        "EXPLODE",
+        "EXPORT",
+        "EXPRESSION",
+        "EXTENDED",
+        "EXTERNAL",
+        "EXTRACT",
+        "FAIL",
+        "FALSE",
+        "FAMILY",
+        "FETCH",
+        "FIELDS",
+        "FILE",
+        "FILTER",
+        "FILTERING",
+        "FINAL",
+        "FINISH",
+        "FIRST",
+        "FIXED",
+        "FLATTERN",
+        "FLOAT",
+        "FOR",
+        "FORCE",
+        "FOREIGN",
+        "FORMAT",
+        "FORWARD",
+        "FOUND",
+        "FREE",
+        "FROM",
+        "FULL",
+        "FUNCTION",
+        "FUNCTIONS",
+        "GENERAL",
+        "GENERATE",
+        "GET",
+        "GLOB",
+        "GLOBAL",
+        "GO",
+        "GOTO",
+        "GRANT",
+        "GREATER",
+        "GROUP",
+        "GROUPING",
+        "HANDLER",
+        "HASH",
+        "HAVE",
+        "HAVING",
+        "HEAP",
+        "HIDDEN",
+        "HOLD",
+        "HOUR",
+        "IDENTIFIED",
+        "IDENTITY",
+        "IF",
+        "IGNORE",
+        "IMMEDIATE",
+        "IMPORT",
+        "IN",
+        "INCLUDING",
+        "INCLUSIVE",
+        "INCREMENT",
+        "INCREMENTAL",
+        "INDEX",
+        "INDEXED",
+        "INDEXES",
+        "INDICATOR",
+        "INFINITE",
+        "INITIALLY",
+        "INLINE",
+        "INNER",
+        "INNTER",
+        "INOUT",
+        "INPUT",
+        "INSENSITIVE",
+        "INSERT",
+        "INSTEAD",
+        "INT",
+        "INTEGER",
+        "INTERSECT",
+        "INTERVAL",
+        "INTO",
+        "INVALIDATE",
+        "IS",
+        "ISOLATION",
+        "ITEM",
+        "ITEMS",
+        "ITERATE",
+        "JOIN",
+        "KEY",
+        "KEYS",
+        "LAG",
+        "LANGUAGE",
+        "LARGE",
+        "LAST",
+        "LATERAL",
+        "LEAD",
+        "LEADING",
+        "LEAVE",
+        "LEFT",
+        "LENGTH",
+        "LESS",
+        "LEVEL",
+        "LIKE",
+        "LIMIT",
+        "LIMITED",
+        "LINES",
+        "LIST",
+        "LOAD",
+        "LOCAL",
+        "LOCALTIME",
+        "LOCALTIMESTAMP",
+        "LOCATION",
+        "LOCATOR",
+        "LOCK",
+        "LOCKS",
+        "LOG",
+        "LOGED",
+        "LONG",
+        "LOOP",
+        "LOWER",
+        "MAP",
+        "MATCH",
+        "MATERIALIZED",
+        "MAX",
+        "MAXLEN",
+        "MEMBER",
+        "MERGE",
+        "METHOD",
+        "METRICS",
+        "MIN",
+        "MINUS",
+        "MINUTE",
+        "MISSING",
+        "MOD",
+        "MODE",
+        "MODIFIES",
+        "MODIFY",
+        "MODULE",
+        "MONTH",
+        "MULTI",
+        "MULTISET",
+        "NAME",
+        "NAMES",
+        "NATIONAL",
+        "NATURAL",
+        "NCHAR",
+        "NCLOB",
+        "NEW",
+        "NEXT",
+        "NO",
+        "NONE",
+        "NOT",
+        "NULL",
+        "NULLIF",
+        "NUMBER",
+        "NUMERIC",
+        "OBJECT",
+        "OF",
+        "OFFLINE",
+        "OFFSET",
+        "OLD",
+        "ON",
+        "ONLINE",
+        "ONLY",
+        "OPAQUE",
+        "OPEN",
+        "OPERATOR",
+        "OPTION",
+        "OR",
+        "ORDER",
+        "ORDINALITY",
+        "OTHER",
+        "OTHERS",
+        "OUT",
+        "OUTER",
+        "OUTPUT",
+        "OVER",
+        "OVERLAPS",
+        "OVERRIDE",
+        "OWNER",
+        "PAD",
+        "PARALLEL",
+        "PARAMETER",
+        "PARAMETERS",
+        "PARTIAL",
+        "PARTITION",
+        "PARTITIONED",
+        "PARTITIONS",
+        "PATH",
+        "PERCENT",
+        "PERCENTILE",
+        "PERMISSION",
+        "PERMISSIONS",
+        "PIPE",
+        "PIPELINED",
+        "PLAN",
+        "POOL",
+        "POSITION",
+        "PRECISION",
+        "PREPARE",
+        "PRESERVE",
+        "PRIMARY",
+        "PRIOR",
+        "PRIVATE",
+        "PRIVILEGES",
+        "PROCEDURE",
+        "PROCESSED",
+        "PROJECT",
+        "PROJECTION",
+        "PROPERTY",
+        "PROVISIONING",
+        "PUBLIC",
+        "PUT",
+        "QUERY",
+        "QUIT",
+        "QUORUM",
+        "RAISE",
+        "RANDOM",
+        "RANGE",
+        "RANK",
+        "RAW",
+        "READ",
+        "READS",
+        "REAL",
+        "REBUILD",
+        "RECORD",
+        "RECURSIVE",
+        "REDUCE",
+        "REF",
+        "REFERENCE",
+        "REFERENCES",
+        "REFERENCING",
+        "REGEXP",
+        "REGION",
+        "REINDEX",
+        "RELATIVE",
+        "RELEASE",
+        "REMAINDER",
+        "RENAME",
+        "REPEAT",
+        "REPLACE",
+        "REQUEST",
+        "RESET",
+        "RESIGNAL",
+        "RESOURCE",
+        "RESPONSE",
+        "RESTORE",
+        "RESTRICT",
+        "RESULT",
+        "RETURN",
+        "RETURNING",
+        "RETURNS",
+        "REVERSE",
+        "REVOKE",
+        "RIGHT",
+        "ROLE",
+        "ROLES",
+        "ROLLBACK",
+        "ROLLUP",
+        "ROUTINE",
+        "ROW",
+        "ROWS",
+        "RULE",
+        "RULES",
+        "SAMPLE",
+        "SATISFIES",
+        "SAVE",
+        "SAVEPOINT",
+        "SCAN",
+        "SCHEMA",
+        "SCOPE",
+        "SCROLL",
+        "SEARCH",
+        "SECOND",
+        "SECTION",
+        "SEGMENT",
+        "SEGMENTS",
+        "SELECT",
+        "SELF",
+        "SEMI",
+        "SENSITIVE",
+        "SEPARATE",
+        "SEQUENCE",
+        "SERIALIZABLE",
+        "SESSION",
+        "SET",
+        "SETS",
+        "SHARD",
+        "SHARE",
+        "SHARED",
+        "SHORT",
+        "SHOW",
+        "SIGNAL",
+        "SIMILAR",
+        "SIZE",
+        "SKEWED",
+        "SMALLINT",
+        "SNAPSHOT",
+        "SOME",
+        "SOURCE",
+        "SPACE",
+        "SPACES",
+        "SPARSE",
+        "SPECIFIC",
+        "SPECIFICTYPE",
+        "SPLIT",
+        "SQL",
+        "SQLCODE",
+        "SQLERROR",
+        "SQLEXCEPTION",
+        "SQLSTATE",
+        "SQLWARNING",
+        "START",
+        "STATE",
+        "STATIC",
+        "STATUS",
+        "STORAGE",
+        "STORE",
+        "STORED",
+        "STREAM",
+        "STRING",
+        "STRUCT",
+        "STYLE",
+        "SUB",
+        "SUBMULTISET",
+        "SUBPARTITION",
+        "SUBSTRING",
+        "SUBTYPE",
+        "SUM",
+        "SUPER",
+        "SYMMETRIC",
+        "SYNONYM",
+        "SYSTEM",
+        "TABLE",
+        "TABLESAMPLE",
+        "TEMP",
+        "TEMPORARY",
+        "TERMINATED",
+        "TEXT",
+        "THAN",
+        "THEN",
+        "THROUGHPUT",
+        "TIME",
+        "TIMESTAMP",
+        "TIMEZONE",
+        "TINYINT",
+        "TO",
+        "TOKEN",
+        "TOTAL",
+        "TOUCH",
+        "TRAILING",
+        "TRANSACTION",
+        "TRANSFORM",
+        "TRANSLATE",
+        "TRANSLATION",
+        "TREAT",
+        "TRIGGER",
+        "TRIM",
+        "TRUE",
+        "TRUNCATE",
+        "TTL",
+        "TUPLE",
+        "TYPE",
+        "UNDER",
+        "UNDO",
+        "UNION",
+        "UNIQUE",
+        "UNIT",
+        "UNKNOWN",
+        "UNLOGGED",
+        "UNNEST",
+        "UNPROCESSED",
+        "UNSIGNED",
+        "UNTIL",
+        "UPDATE",
+        "UPPER",
+        "URL",
+        "USAGE",
+        "USE",
+        "USER",
+        "USERS",
+        "USING",
+        "UUID",
+        "VACUUM",
+        "VALUE",
+        "VALUED",
+        "VALUES",
+        "VARCHAR",
+        "VARIABLE",
+        "VARIANCE",
+        "VARINT",
+        "VARYING",
+        "VIEW",
+        "VIEWS",
+        "VIRTUAL",
+        "VOID",
+        "WAIT",
+        "WHEN",
+        "WHENEVER",
+        "WHERE",
+        "WHILE",
+        "WINDOW",
+        "WITH",
+        "WITHIN",
+        "WITHOUT",
+        "WORK",
+        "WRAPPED",
+        "WRITE",
+        "YEAR",
+        "ZONE",
+    }
+)
@@ -0,0 +1,15 @@
+from setuptools import find_packages, setup
+
+setup(
+    name="cascading_etl",
+    version="1.0.0",
+    description="Modules shared by the collectors of the cascading ETL pipeline",
+    packages=find_packages(include=["cascading_etl"]),
+    python_requires=">=3.8",
+    install_requires=[
+        "boto3",
+        "python-json-logger",
+        "requests>=2.32.4,<3",
+        "urllib3>=1.26.20,<2; python_version < '3.10'",
+    ],
+)
@@ -0,0 +1,115 @@
+import json, random
+
+import pytest
+
+from cascading_etl.http_client import _iter_array
+
+# documents shaped like the API's, each with the keys leading to the array and the items expected
+DOCUMENTS = {
+    "numbers": (
+        '{"result": {"sales": [1.5, -2e3, 3E-2, 0, 12345678901234567890, -0.25e+10]}}',
+        ("result", "sales"),
+    ),
+    "escaped quotes": (
+        r'{"result": {"sales": [{"id": "a\"b", "note": "\\"}, {"id": "\\\"]"}, "]\"["]}}',
+        ("result", "sales"),
+    ),
+    "multi-byte utf-8": (
+        '{"result": {"sales": [{"product": "crème brûlée 纸 📎", "quantity": 1}, "ü"]}}',
+        ("result", "sales"),
+    ),
+    "nested sales keys": (
+        '{"meta": {"sales": [0]}, "result": {"summary": {"sales": [-1]}, "sales": [{"sales": [2]}, 3]}}',
+        ("result", "sales"),
+    ),
+    "literals": (
+        '{"result": {"sales": [true, false, null, [], {}, [1, [2]], {"a": {"b": [3]}}]}}',
+        ("result", "sales"),
+    ),
+    "whitespace": (
+        '\n{ "result" :\t{ "sales" :\r\n[ 1 ,\n 2.0 ,\t"x" ] } }\n',
+        ("result", "sales"),
+    ),
+    "top-level array": ('{"result": [{"id": 1}, {"id": 2}]}', ("result",)),
+}
+
+
+def expected(document, keys):
+    value = json.loads(document)
+    for key in keys:
+        value = (value or {}).get(key)
+    return value or []
+
+
+def split(data, *positions):
+    bounds = [0, *positions, len(data)]
+    return [data[a:b] for a, b in zip(bounds, bounds[1:])]
+
+
+@pytest.mark.parametrize("name", sorted(DOCUMENTS))
+def test_every_single_split(name):
+    document, keys = DOCUMENTS[name]
+    data = document.encode("utf-8")
+    for position in range(len(data) + 1):
+        # splits within a multi-byte character, a number, a string or an escape sequence included
+        assert list(_iter_array(split(data, position), keys)) == expected(document, keys), position
+
+
+@pytest.mark.parametrize("name", sorted(DOCUMENTS))
+def test_one_byte_chunks(name):
+    document, keys = DOCUMENTS[name]
+    data = document.encode("utf-8")
+    chunks = [data[i : i + 1] for i in range(len(data))]
+    assert list(_iter_array(chunks, keys)) == expected(document, keys)
+
+
+@pytest.mark.parametrize(
+    "document",
+    [
+        '{"result": null}',
+        '{"result": {"sales": null}}',
+        '{"result": {}}',
+        '{"result": {"sales": []}}',
+        '{"error": "not found"}',
+        "",
+    ],
+)
+def test_missing_array(document):
+    data = document.encode("utf-8")
+    for position in range(len(data) + 1):
+        assert list(_iter_array(split(data, position), ("result", "sales"))) == []
+
+
+def test_truncated_item_raises():
+    with pytest.raises(ValueError):
+        list(_iter_array([b'{"result": [{"id": 1}, {"id": '], ("result",)))
+
+
+def test_random_documents():
+    # random documents and chunk boundaries, checked against json.loads
+    rng = random.Random(0)
+
+    def value(depth):
+        kind = rng.randrange(7 if depth < 3 else 4)
+        if kind == 0:
+            return rng.choice([0, -7, 1.5, -0.001, 2e21, 3.25e-8, 10 ** 20])
+        if kind == 1:
+            return "".join(rng.choice('ab"\\/]},[{: é纸📎\n\t') for _ in range(rng.randrange(6)))
+        if kind == 2:
+            return rng.choice([True, False, None])
+        if kind == 3:
+            return rng.randrange(-1000, 1000)
+        if kind == 4:
+            return [value(depth + 1) for _ in range(rng.randrange(4))]
+        return {rng.choice(["sales", "id", "result", "x"]): value(depth + 1) for _ in range(rng.randrange(4))}
+
+    for _ in range(500):
+        items = [value(1) for _ in range(rng.randrange(6))]
+        document = json.dumps(
+            {"meta": value(1), "result": {"sales": items, "other": value(1)}},
+            ensure_ascii=rng.random() < 0.5,
+            indent=rng.choice([None, 1]),
+        )
+        data = document.encode("utf-8")
+        positions = sorted(rng.sample(range(len(data) + 1), min(len(data), rng.randrange(1, 8))))
+        assert list(_iter_array(split(data, *positions), ("result", "sales"))) == items, document
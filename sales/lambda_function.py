@@ -1,5 +1,6 @@
 import json
 import logging
+from cascading_etl import metrics
 from pythonjsonlogger import jsonlogger
 from service import service, config
 
@@ -41,10 +42,16 @@ def lambda_handler(event, context):
         context(dict): The context object provided by the Lambda runtime.
 
     Returns:
-        dict: A dictionary containing the response for the Lambda function.
+        dict: A dictionary containing the response for the Lambda function, or the partial batch response for an SQS event.
 
     """
     LOGGER.info("Starting lambda executing.", extra=_lambda_context(context))
-    service.main(event, ENV)
+    try:
+        response = service.main(event, ENV, context)
+    finally:
+        # one EMF document per invocation, with the time spent in the API, DynamoDB and SQS
+        metrics.flush(context.function_name)
     LOGGER.info("Successful lambda execution.", extra=_lambda_context(context))
+    if response is not None:
+        return response
     return {"statusCode": 200}
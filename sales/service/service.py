@@ -1,79 +1,316 @@
-import logging, ast, requests, sys
-from utils import *
+import logging, sys
+from cascading_etl import envelope, http_client, pipeline
+from cascading_etl.utils import *
 from datetime import datetime, timedelta
-from boto3.dynamodb.conditions import Key
 
 LOGGER = logging.getLogger(__name__)
 
+# format of the `transaction_timestamp` of the sales in the API
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+# how far back the sales are always read, to catch the sales that show up late in the API
+LOOKBACK = timedelta(hours=24)
 
-def main(event, environment):
+
+def main(event, environment, context=None):
     """
     Process the invoking event data and update the DynamoDB table with relevant sales information.
 
     Args:
         event (dict): A JSON-formatted document that contains data for a Lambda function to process.
         environment (dict): A context object that provides methods and properties about the invocation, function and runtime environment.
+        context: The context object provided by the Lambda runtime, used to drain the queue within the time limit (default: None).
 
     Returns:
-        None
+        dict: The messages that failed when invoked with an SQS event, None otherwise.
 
     Raises:
-        SystemExit: If an exception occurs during the execution.
+        SystemExit: If an exception occurs during the execution of a scheduled invocation.
 
     Notes:
-        - The function retrieves messages from an SQS queue and processes each message.
-        - Each message is expected to contain a 'Body' field that is evaluated as a dictionary using `ast.literal_eval`.
+        - The function processes the messages of the SQS event, or drains the SQS queue with `drain_messages` when scheduled.
+        - With several `SQS` queues, one per shard, a scheduled invocation drains the shard given as {"shard": <index>}, the first one by default.
+        - Each message is expected to contain a 'Body' field that is unwrapped with `envelope.decode`, holding one or several salespersons.
         - The function fetches sales information for a specified employee ID from a specified URL.
-        - Only sales transactions made within the last 24 hours are considered for updating the DynamoDB table.
-        - The function checks if the sale record is already ingested into the table using the `ingestionCompleted` function.
-        - If the sale record is not already ingested, it is updated in the table along with the branch ID.
-        - The function logs successful ingestion of sale records and deletes processed messages from the SQS queue.
+        - Only sales transactions made within the last 24 hours, or since the salesperson's checkpoint in `CHECKPOINT_DB`
+          if it's older, are considered for updating the DynamoDB table.
+        - The function checks which sale records are not ingested into the table yet using the `diff_records` function.
+        - If the sale record is not already ingested, it is written to the table along with the branch ID in batches with `BatchWriter`.
+        - The function logs successful ingestion of sale records and deletes processed messages from the SQS queue, a batch at a time.
         - If an exception occurs during execution, the function logs the error and exits the program with a status code of 1.
+        - With an SQS event, a failing message is reported in `batchItemFailures` instead, so that only it is retried.
+        - With `ENGINE` set to "async", the messages are processed concurrently by `run_async` instead of one by one.
 
     """
     LOGGER.info(event)
 
-    sqs = environment["SQS"]
+    # a scheduled invocation drains the shard named in its event
+    sqs = environment["SQS"].split(",")[int(event.get("shard", 0))]
     table = environment["DB"]
+    checkpoints = environment["CHECKPOINT_DB"] or None
+    fingerprint_cache.enabled = environment["FINGERPRINT_CACHE"] == "on"
+    fingerprint_cache.ttl = int(environment["FINGERPRINT_CACHE_TTL"])
+    http_client.streaming = environment["STREAMING"] == "on"
+    http_client.page_size = int(environment["PAGE_SIZE"])
 
-    messages = receive_message(sqs)
-    for message in messages:
-        try:
-            message_body = message["Body"]
-            body = ast.literal_eval(message_body)
-            employee_id = str(body["employee_id"])
-            branch_id = str(body["branch_id"]) + 'c'
-            # go to a path that allows users to retrieve all information of the sales given that the salesperson ID is provided
-            response = requests.get(
-                url=f"www.dundermifflinpaper.com/sales/?salespersonsID={employee_id}"
-            )
-            sales = (
-                response.json().get("result").get("sales")
-            )  # all the sales records of this salesperson
-            now = datetime.utcnow()  # the unix timestamp of the current time in UTC
-            for sale in sales:
-                sale_timestamp = datetime.strptime(
-                    sale["transaction_timestamp"], "%Y-%m-%d %H:%M:%S"
-                )
-                if (
-                    now - timedelta(hours=24) <= sale_timestamp and sale_timestamp < now
-                ):  # only look for the transactions made within the last 24 hrs
-                    if not upToDate(
+    # invoked by the event source mapping, which deletes the successful messages itself
+    from_event = bool(event.get("Records"))
+    if from_event:
+        batches = [event_messages(event)]
+    elif context is not None:
+        # scheduled: keep pulling batches for as long as the invocation allows
+        batches = drain_messages(
+            sqs, context, int(environment["DRAIN_SAFETY_MARGIN"])
+        )
+    else:
+        batches = [receive_message(sqs)]
+
+    concurrency = int(environment["MAX_CONCURRENCY"])
+    executor = None
+    if environment["ENGINE"] == "async":
+        # only imported by the functions that use it, it's a sizeable share of a cold start
+        import asyncio
+        from concurrent.futures import ThreadPoolExecutor
+
+        # shared by all the batches of the invocation
+        executor = ThreadPoolExecutor(max_workers=2 * concurrency)
+
+    failures = []
+    try:
+        for messages in batches:
+            if environment["ENGINE"] == "async":
+                failures += asyncio.run(
+                    run_async(
+                        messages,
+                        None if from_event else sqs,
                         table,
-                        Key("sale_id").eq(str(sale["id"])),
-                        sale,
-                        "sale_",
-                    ):
-                        # only update DynamoDB table when it's NOT complete ingesting
-                        sale[
-                            "branch_id"
-                        ] = branch_id  # append branch info to the sale payload
-                        update_info(table, sale)
-                        LOGGER.info(
-                            f"Successfully ingested the sale record {sale['id']} into our database!"
-                        )
-            delete_message(sqs, message["ReceiptHandle"])
+                        executor,
+                        concurrency,
+                        checkpoints,
+                    )
+                )
+                continue
+
+            processed = []
+            try:
+                for message in messages:
+                    try:
+                        store_sales(table, fetch_sales(message, checkpoints), checkpoints)
+                        processed.append(message)
+
+                    except Exception as e:
+                        LOGGER.error(str(e), exc_info=True)
+                        if not from_event:
+                            sys.exit(1)
+                        failures.append(message)
+            finally:
+                # acknowledge the processed messages of the batch at once
+                if not from_event:
+                    delete_messages(sqs, processed)
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    LOGGER.info("fingerprint cache usage", extra=fingerprint_cache.stats())
+    if from_event:
+        return batch_item_failures(failures)
+    if failures:
+        sys.exit(1)
+
+
+def fetch_sales(message, checkpoints=None):
+    """
+    Retrieve the recent sales of the salespersons named in a message.
+
+    Args:
+        message (dict): The SQS message, whose 'Body' holds one or several workloads of a branch ID and employee ID.
+        checkpoints (str): The name of the DynamoDB table of checkpoints, None to look back 24 hours (default: None).
+
+    Returns:
+        List[dict]: The sales not ingested yet, with the branch ID and employee ID appended.
 
+    """
+    incoming = envelope.decode(message["Body"])
+    recent_sales = []
+    for workload in envelope.unpack(incoming):
+        LOGGER.info(
+            f"processing salesperson {workload['employee_id']}",
+            extra={"trace_id": incoming["trace_id"]},
+        )
+        recent_sales += fetch_salesperson_sales(workload, checkpoints)
+    return recent_sales
+
+
+def fetch_salesperson_sales(workload, checkpoints=None):
+    """
+    Retrieve the recent sales of a salesperson.
+
+    Args:
+        workload (dict): The branch ID and employee ID of the salesperson.
+        checkpoints (str): The name of the DynamoDB table of checkpoints, None to look back 24 hours (default: None).
+
+    Returns:
+        List[dict]: The sales not ingested yet, with the branch ID and employee ID appended.
+
+    Notes:
+        - The sales made within `LOOKBACK` are retrieved, or since the checkpoint of the salesperson if it's older,
+          so a run delayed beyond `LOOKBACK` leaves no gap and a sale showing up late with an older timestamp is still caught.
+        - The sales already ingested are read again within the overlap, and dropped by `diff_records` downstream.
+        - The start of the window is always passed to the API as `since`, with or without a checkpoint,
+          and used by `filter_window` in case the API ignores it.
+        - The response is streamed through `filter_window`, so only the sales within the window are held in memory.
+        - With `http_client.page_size` set, the sales are requested page by page, the next page being fetched while the current one is filtered.
+
+    """
+    employee_id = str(workload["employee_id"])
+    branch_id = str(workload["branch_id"]) + 'c'
+    checkpoint = read_checkpoint(checkpoints, employee_id) if checkpoints else None
+    # the current time in UTC, to the second like the transaction timestamps
+    now = datetime.utcnow().replace(microsecond=0)
+    # only look for the transactions made within the last 24 hrs, or since the checkpoint if it's older
+    start = (now - LOOKBACK).strftime(TIMESTAMP_FORMAT)
+    if checkpoint:
+        start = min(start, checkpoint)
+    end = now.strftime(TIMESTAMP_FORMAT)
+    # go to a path that allows users to retrieve all information of the sales given that the salesperson ID is provided
+    # all the sales records of this salesperson, decoded one at a time as they're received
+    pages = http_client.iter_pages(
+        f"/sales/?salespersonsID={employee_id}",
+        ("result", "sales"),
+        params={"since": start},
+    )
+    return pipeline.collect(
+        pipeline.source(pages),
+        lambda sales: filter_window(sales, start, end),
+        # append branch info to the sale payload, and the range key of the sale table
+        pipeline.each(
+            lambda sale: sale.update(branch_id=branch_id, employee_id=employee_id)
+        ),
+    )
+
+
+def filter_window(sales, start, end):
+    """
+    Keep the sales made within a time window.
+
+    Args:
+        sales (Iterable[dict]): The sales retrieved from the API.
+        start (str): The earliest `transaction_timestamp` to keep, formatted with `TIMESTAMP_FORMAT`.
+        end (str): The latest `transaction_timestamp` to keep, formatted with `TIMESTAMP_FORMAT`.
+
+    Returns:
+        List[dict]: The sales whose timestamp is within [start, end].
+
+    Notes:
+        - `TIMESTAMP_FORMAT` is fixed-width and zero-padded, so the timestamps sort as strings
+          and are compared with the bounds without being parsed.
+
+    """
+    return [sale for sale in sales if start <= sale["transaction_timestamp"] <= end]
+
+
+def store_sales(table, sales, checkpoints=None):
+    """
+    Write the sales that are not ingested yet to the DynamoDB table.
+
+    Args:
+        table (str): The name of the DynamoDB table of sales.
+        sales (List[dict]): The sales retrieved by `fetch_sales`.
+        checkpoints (str): The name of the DynamoDB table of checkpoints, None to keep none (default: None).
+
+    Returns:
+        None
+
+    Notes:
+        - The sales flow through the `pipeline` stages `diff` and `sink`, and are logged as ingested once their batch is written.
+        - Once the sales are written, the checkpoint of every salesperson is moved to its latest sale.
+
+    """
+    # only update DynamoDB table when it's NOT complete ingesting
+    pipeline.run(
+        sales,
+        pipeline.diff(table, "sale_"),
+        pipeline.sink(table, "sale_"),
+        pipeline.each(
+            lambda sale: LOGGER.info(
+                f"Successfully ingested the sale record {sale['id']} into our database!"
+            )
+        ),
+    )
+
+    if checkpoints:
+        latest = {}
+        for sale in sales:
+            employee_id = sale["employee_id"]
+            latest[employee_id] = max(
+                latest.get(employee_id, ""), sale["transaction_timestamp"]
+            )
+        for employee_id, timestamp in latest.items():
+            advance_checkpoint(checkpoints, employee_id, timestamp)
+
+
+async def run_async(messages, sqs, table, executor, concurrency, checkpoints=None):
+    """
+    Process messages with asyncio, overlapping the API calls of some salespersons with the writes of others.
+
+    Args:
+        messages (List[dict]): The messages received from the SQS queue.
+        sqs (str): The URL of the SQS queue to delete the processed messages from, None to leave them.
+        table (str): The name of the DynamoDB table of sales.
+        executor (concurrent.futures.ThreadPoolExecutor): The pool the blocking calls run in, of at least
+            2 * `concurrency` workers, shared by the batches of an invocation.
+        concurrency (int): The maximum number of API calls, and of writes, in flight.
+        checkpoints (str): The name of the DynamoDB table of checkpoints, None to look back 24 hours (default: None).
+
+    Returns:
+        List[dict]: The messages that failed.
+
+    Notes:
+        - The blocking API and DynamoDB calls run in a thread pool so that they don't block the event loop.
+        - Fetched sales wait in a queue bounded by `concurrency`, so the API calls pause when the writes fall behind.
+        - A failing message is logged and left in the SQS queue to be retried, the others carry on.
+
+    """
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    fetched = asyncio.Queue(maxsize=concurrency)
+    fetching = asyncio.Semaphore(concurrency)
+    processed = []
+    failures = []
+
+    async def fetch(message):
+        try:
+            async with fetching:
+                sales = await loop.run_in_executor(
+                    executor, fetch_sales, message, checkpoints
+                )
+            await fetched.put((message, sales))
         except Exception as e:
             LOGGER.error(str(e), exc_info=True)
-            sys.exit(1)
+            failures.append(message)
+
+    async def store():
+        while True:
+            message, sales = await fetched.get()
+            try:
+                await loop.run_in_executor(
+                    executor, store_sales, table, sales, checkpoints
+                )
+                processed.append(message)
+            except Exception as e:
+                LOGGER.error(str(e), exc_info=True)
+                failures.append(message)
+            finally:
+                fetched.task_done()
+
+    stores = [asyncio.ensure_future(store()) for _ in range(concurrency)]
+    try:
+        await asyncio.gather(*(fetch(message) for message in messages))
+        await fetched.join()
+    finally:
+        for task in stores:
+            task.cancel()
+        # acknowledge the processed messages at once
+        if sqs:
+            delete_messages(sqs, processed)
+    return failures
@@ -1,8 +1,4 @@
-import os
-import sys
-import logging
-
-LOGGER = logging.getLogger(__name__)
+from cascading_etl.config import read_env
 
 
 def load_env():
@@ -19,19 +15,30 @@ def load_env():
             - LOGGING_LEVEL: Specifies the logging level for the application.
             - APP_ENV: Specifies the application environment.
             - SOURCE_SQS: Specifies the SOURCE_SQS environment variable.
-            - TARGET_SQS: Specifies the TARGET_SQS environment variable.
+            - TARGET_SQS: Specifies the TARGET_SQS environment variable, the comma-separated URLs of the shards of the sale queue.
             - DB: Specifies the DB environment variable.
+        - Optional environment variables fall back to a default:
+            - FINGERPRINT_CACHE: "on" or "off", whether fingerprints are cached across invocations (default: "on").
+            - FINGERPRINT_CACHE_TTL: The number of seconds a cached fingerprint is trusted for (default: "900").
+            - WORKLOADS_PER_MESSAGE: The maximum number of salespersons packed in a message to the sale collector (default: "1").
+            - DRAIN_SAFETY_MARGIN: The number of milliseconds left to a scheduled invocation under which the queue is no longer polled (default: "120000").
+            - PAGE_SIZE: The number of items requested per page from the API, "0" for endpoints answering in a single response (default: "0").
         - If any of the required environment variables are missing, a KeyError is raised.
         - The function logs an exception message indicating the missing environment variable and exits the program with a status code of 1.
     """
-    try:
-        return {
-            "LOGGING_LEVEL": os.environ["LOGGING_LEVEL"],
-            "APP_ENV": os.environ["APP_ENV"],
-            "SOURCE_SQS": os.environ["SOURCE_SQS"],
-            "TARGET_SQS": os.environ["TARGET_SQS"],
-            "DB": os.environ["DB"],
-        }
-    except KeyError as error:
-        LOGGER.exception("Enviroment variable %s is required.", error)
-        sys.exit(1)
+    return read_env(
+        required=(
+            "LOGGING_LEVEL",
+            "APP_ENV",
+            "SOURCE_SQS",
+            "TARGET_SQS",
+            "DB",
+        ),
+        optional={
+            "FINGERPRINT_CACHE": "on",
+            "FINGERPRINT_CACHE_TTL": "900",
+            "DRAIN_SAFETY_MARGIN": "120000",
+            "WORKLOADS_PER_MESSAGE": "1",
+            "PAGE_SIZE": "0",
+        },
+    )
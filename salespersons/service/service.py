@@ -1,77 +1,145 @@
-import logging, ast, requests, sys
-from utils import *
-from boto3.dynamodb.conditions import Key
+import logging, sys
+from cascading_etl import envelope, http_client, pipeline
+from cascading_etl.utils import *
 
 LOGGER = logging.getLogger(__name__)
 
 
-def main(event, environment):
+def main(event, environment, context=None):
     """
     Process the invoking event data and perform operations related to employees based on the input branch ID.
 
     Args:
         event (dict): A JSON-formatted document that contains data for a Lambda function to process.
         environment (dict): A context object that provides methods and properties about the invocation, function and runtime environment.
+        context: The context object provided by the Lambda runtime, used to drain the queue within the time limit (default: None).
 
     Returns:
-        None
+        dict: The messages that failed when invoked with an SQS event, None otherwise.
 
     Raises:
-        SystemExit: If an exception occurs during the execution.
+        SystemExit: If an exception occurs during the execution of a scheduled invocation.
 
     Notes:
-        - The function retrieves messages from a source SQS queue and processes each message.
-        - Each message is expected to contain a 'body' field that is evaluated as a dictionary using `ast.literal_eval`.
+        - The function processes the messages of the SQS event, or drains the source SQS queue with `drain_messages` when scheduled.
+        - Each message is expected to contain a 'Body' field that is unwrapped with `envelope.decode`.
         - The function fetches employee information for a specified branch ID from a specified URL.
         - Only employees with the occupation of 'salesperson' are considered for updating the DynamoDB table.
-        - The function checks if the employee record is already ingested into the table using the `ingestionCompleted` function.
-        - If the employee record is not already ingested, it is updated in the table.
-        - The function delivers a message containing the branch ID and employee ID to a target SQS queue for the next stage.
-        - The function logs the successful sending of employees to the target queue and deletes processed messages from the source queue.
+        - The function checks which employee records are not ingested into the table yet using the `diff_records` function.
+        - If the employee record is not already ingested, it is written to the table in batches with `BatchWriter`.
+        - The function delivers messages containing the branch ID and employee IDs to a target SQS queue for the next stage, in batches with `MessageBatcher`.
+        - Up to `WORKLOADS_PER_MESSAGE` salespersons are packed in a message with `envelope.pack`.
+        - With several `TARGET_SQS` queues, the salespersons are routed to them by their employee ID with `pipeline.shard_of`.
+        - The function logs the successful sending of employees to the target queue and deletes processed messages from the source queue, a batch at a time.
         - If an exception occurs during execution, the function logs the error and exits the program with a status code of 1.
+        - With an SQS event, a failing message is reported in `batchItemFailures` instead, so that only it is retried.
 
     """
     LOGGER.info(event)
 
     source_sqs = environment["SOURCE_SQS"]
-    target_sqs = environment["TARGET_SQS"]
+    # the sale queue, or its shards
+    target_sqs = environment["TARGET_SQS"].split(",")
     table = environment["DB"]
+    per_message = int(environment["WORKLOADS_PER_MESSAGE"])
+    fingerprint_cache.enabled = environment["FINGERPRINT_CACHE"] == "on"
+    fingerprint_cache.ttl = int(environment["FINGERPRINT_CACHE_TTL"])
+    http_client.page_size = int(environment["PAGE_SIZE"])
 
-    messages = receive_message(source_sqs)
+    # invoked by the event source mapping, which deletes the successful messages itself
+    from_event = bool(event.get("Records"))
+    if from_event:
+        batches = [event_messages(event)]
+    elif context is not None:
+        # scheduled: keep pulling batches for as long as the invocation allows
+        batches = drain_messages(
+            source_sqs, context, int(environment["DRAIN_SAFETY_MARGIN"])
+        )
+    else:
+        batches = [receive_message(source_sqs)]
 
-    for message in messages:
+    failures = []
+    for messages in batches:
+        processed = []
         try:
-            message_body = message["body"]
-            body = ast.literal_eval(message_body)
-            branch_id = str(body["branch_id"])
-            # go to a path that allows users to retrieve all information of the employees based on the input branch id
-            response = requests.get(
-                url=f"www.dundermifflinpaper.com/employees?branchID={branch_id}"
+            for message in messages:
+                try:
+                    process_message(message, target_sqs, table, per_message)
+                    processed.append(message)
+
+                except Exception as e:
+                    LOGGER.error(str(e), exc_info=True)
+                    if not from_event:
+                        sys.exit(1)
+                    failures.append(message)
+        finally:
+            # acknowledge the processed messages of the batch at once
+            if not from_event:
+                delete_messages(source_sqs, processed)
+
+    LOGGER.info("fingerprint cache usage", extra=fingerprint_cache.stats())
+    if from_event:
+        return batch_item_failures(failures)
+
+
+def process_message(message, target_sqs, table, per_message=1):
+    """
+    Update the DynamoDB table with the salespersons of the branch named in a message and deliver them to the next stage.
+
+    Args:
+        message (dict): The SQS message, whose 'Body' holds the branch ID.
+        target_sqs (List[str]): The URLs of the SQS queues of the next stage, one per shard.
+        table (str): The name of the DynamoDB table of salespersons.
+        per_message (int): The maximum number of salespersons packed in a message to the next stage (default: 1).
+
+    Returns:
+        None
+
+    Notes:
+        - The API is read page by page with `http_client.iter_pages`, the next page being fetched while the current one is diffed and written.
+        - The salespersons flow through the `pipeline` stages: `keep` drops the other employees, `diff` the salespersons up to date,
+          `sink` writes the rest, then all the salespersons are delivered by `emit`.
+
+    """
+    incoming = envelope.decode(message["Body"])
+    body = incoming["body"]
+    # messages sent before the envelope existed name the branch 'branch'
+    branch_id = str(body.get("branch_id", body.get("branch")))
+    LOGGER.info(
+        f"processing branch {branch_id}", extra={"trace_id": incoming["trace_id"]}
+    )
+    # go to a path that allows users to retrieve all information of the employees based on the input branch id
+    pages = http_client.iter_pages(
+        f"/employees?branchID={branch_id}", ("result", "employees")
+    )
+
+    workloads = []
+    # only update DynamoDB table when it's NOT complete ingesting
+    pipeline.run(
+        pipeline.source(pages),
+        # only looking for salespersons
+        pipeline.keep(lambda employee: employee["occupation"] == "salesperson"),
+        pipeline.each(
+            lambda employee: workloads.append(
+                {"branch_id": branch_id, "employee_id": str(employee["id"])}
             )
-            response = response.json().get("result")
-            
-            if response:
-                employees = response.json().get("result").get("employees")
-                for employee in employees:
-                    if (
-                        employee["occupation"] == "salesperson"
-                    ):  # only looking for salespersons
-                        if not upToDate(
-                            table,
-                            Key("employee_id").eq(str(employee["id"])),
-                            employee,
-                            "employee_",
-                        ):
-                            # only update DynamoDB table when it's NOT complete ingesting
-                            update_info(table, employee)
-                        employee_id = str(employee["branch_id"])
-                        workload = {"branch_id": branch_id, "employee_id": employee_id}
-                        deliver_message(target_sqs, workload)
-                        LOGGER.info(
-                            f"Employee {employee_id} of branch {branch_id} is successfully sent to queue for the next stage!"
-                        )
-            delete_message(source_sqs, message["ReceiptHandle"])
-
-        except Exception as e:
-            LOGGER.error(str(e), exc_info=True)
-            sys.exit(1)
+        ),
+        pipeline.diff(table, "employee_"),
+        pipeline.sink(table, "employee_"),
+    )
+
+    if workloads:
+        # the salespersons are persisted before being handed over to the next stage
+        messages = pipeline.run(
+            workloads,
+            pipeline.emit(
+                target_sqs,
+                "salesperson",
+                incoming["trace_id"],
+                per_message,
+                key=lambda workload: workload["employee_id"],
+            ),
+        )
+        LOGGER.info(
+            f"{len(workloads)} employees of branch {branch_id} are successfully sent to queue for the next stage in {messages} messages!"
+        )